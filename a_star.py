@@ -0,0 +1,85 @@
+#A* Search
+#18-Oct-'26
+
+#A* search over a graph represented as a dict of dicts, as used by changing_mazes.graph
+#The parent key is a node and the associated dictionary maps its successors to the edge weights
+#Shared by the puzzles that need a shortest path: pass the zero heuristic to run Dijkstra's algorithm
+
+from heapq import heappop
+from heapq import heappush
+from itertools import count
+from math import sqrt
+
+def manhattan(pos1, pos2):
+    """
+    (tuple of ints, tuple of ints) -> int
+
+    Returns the 1D distance between two points
+    Admissible when only horizontal and vertical moves are allowed
+    """
+
+    x1, y1 = pos1
+    x2, y2 = pos2
+    return abs(x1-x2)+abs(y1-y2)
+
+def octile(pos1, pos2):
+    """
+    (tuple of ints, tuple of ints) -> float
+
+    Returns the distance between two points when diagonal moves of length sqrt(2) are allowed
+    """
+
+    dx = abs(pos1[0]-pos2[0])
+    dy = abs(pos1[1]-pos2[1])
+    return max(dx, dy) + (sqrt(2)-1)*min(dx, dy)
+
+def zero(pos1, pos2):
+    """
+    (object, object) -> int
+
+    No estimate at all, turning A* into Dijkstra's algorithm
+    """
+
+    return 0
+
+def a_star(graph_dict, start, end=None, heuristic=zero):
+    """
+    (dict of dicts, object, object, function) -> dict
+
+    A* search from start using a binary heap with lazy deletion
+    Improved nodes are pushed again and their stale heap entries are skipped when popped
+    Expanded nodes go into a closed set and are never expanded again, which requires a consistent heuristic
+    Ties on f are broken in favour of the larger g, i.e. the node closer to the end
+    Stop once end has been expanded, or expand every reachable node if end is None
+
+    Return a dict of the expanded nodes and their distances from start
+    The number of expanded nodes is therefore the length of the returned dict
+    """
+
+    closed = {}
+    g_score = {start: 0}
+
+    #The counter stops the heap from ever comparing two nodes
+    tie_breaker = count()
+    heap = [(heuristic(start, end), 0, next(tie_breaker), start)]
+
+    while heap:
+        f, negative_g, _, node = heappop(heap)
+        if node in closed:
+            continue
+
+        node_g = -negative_g
+        closed[node] = node_g
+        if node == end:
+            break
+
+        for neighbour, weight in graph_dict.get(node, {}).items():
+            if neighbour in closed:
+                continue
+
+            new_g_score = node_g + weight
+            if new_g_score < g_score.get(neighbour, float("inf")):
+                g_score[neighbour] = new_g_score
+                heappush(heap, (new_g_score + heuristic(neighbour, end), -new_g_score, next(tie_breaker), neighbour))
+
+    return closed
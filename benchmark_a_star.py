@@ -0,0 +1,179 @@
+#A* Benchmark
+#18-Oct-'26
+
+#Compare the heap-based a_star engine against the original PriorityQueue implementation of graph.find_shortest_path
+#Both are run on the sample maze from changing_mazes with each relevant barrier removed, and on a larger random maze
+#Graphs are searched before and after simplify()
+#Jump Point Search is compared with A* on grids with large open areas
+
+import random
+import timeit
+from queue import PriorityQueue
+
+from a_star import a_star
+from a_star import manhattan
+from a_star import octile
+from a_star import zero
+from changing_mazes import SAMPLE_MAZE
+from changing_mazes import graph
+from changing_mazes import JumpGrid
+
+def priority_queue_a_star(path):
+    """
+    (graph) -> (int, int)
+
+    The original graph.find_shortest_path, counting the nodes it expands
+    Return the number of steps from the start to end +1 and the number of expansions
+    """
+
+    open_queue = PriorityQueue()
+    open_set = {path.start}
+
+    g_score = {node: float("inf") for node in path.nodes}
+    g_score[path.start] = 0
+    f_score = {node: float("inf") for node in path.nodes}
+    f_score[path.start] = manhattan(path.start, path.end)
+    open_queue.put((f_score[path.start], path.start))
+
+    expanded = 0
+    current_node = path.start
+    while current_node != path.end:
+        if len(open_set) == 0:
+            return (float("inf"), expanded)
+
+        current_node = open_queue.get()[1]
+        open_set.remove(current_node)
+        expanded += 1
+
+        for neighbour in path.graph_dict[current_node]:
+            new_g_score = g_score[current_node] + path.graph_dict[current_node][neighbour]
+            if new_g_score < g_score[neighbour]:
+                g_score[neighbour] = new_g_score
+                f_score[neighbour] = new_g_score + manhattan(neighbour, path.end)
+                if neighbour not in open_set:
+                    open_queue.put((f_score[neighbour], neighbour))
+                    open_set.add(neighbour)
+
+    return (g_score[path.end] + 1, expanded)
+
+def build_graphs(maze, simplified, one_barrier):
+    """
+    (list of lists, bool, bool) -> list of graphs
+
+    Generate the nodes and graph dictionary, simplifying until the graph stops changing if required
+    With one_barrier, build one graph per relevant barrier with that barrier added, as solution_by_barrier() does
+    """
+
+    barriers = [None]
+    if one_barrier:
+        path = graph(maze)
+        path.generate_barriers()
+        path.remove_irrelevant_barriers()
+        barriers = sorted(path.barriers)
+
+    graphs = []
+    for barrier in barriers:
+        path = graph(maze)
+        path.generate_nodes()
+        if barrier is not None:
+            path.add_node(barrier)
+        path.generate_graph_dict()
+        while simplified and path.simplify():
+            pass
+        graphs.append(path)
+    return graphs
+
+def random_maze(size, density, seed):
+    """
+    (int, float, int) -> list of lists
+
+    Generate a square maze with the given fraction of barriers, keeping the corners open
+    """
+
+    generator = random.Random(seed)
+    maze = [[1 if generator.random() < density else 0 for x in range(size)] for y in range(size)]
+    maze[0][0] = 0
+    maze[-1][-1] = 0
+    return maze
+
+def rooms_maze(size, room_size):
+    """
+    (int, int) -> list of lists
+
+    Generate a square maze of open rooms separated by walls with one door in the middle of each wall
+    """
+
+    maze = [[0]*size for y in range(size)]
+    for wall in range(room_size, size, room_size):
+        for position in range(size):
+            if position % room_size != room_size//2:
+                maze[wall][position] = 1
+                maze[position][wall] = 1
+    return maze
+
+def benchmark(name, maze, simplified, one_barrier=False, repeats=20):
+    """
+    (str, list of lists, bool, bool, int) -> NoneType
+
+    Time both engines over the graphs built from one maze
+    Print the shortest path length, total expansions and total time per round of searches
+    """
+
+    graphs = build_graphs(maze, simplified, one_barrier)
+    old_results = [priority_queue_a_star(path) for path in graphs]
+    old_time = min(timeit.repeat(lambda: [priority_queue_a_star(path) for path in graphs], number=1, repeat=repeats))
+
+    new_lengths = [path.find_shortest_path() for path in graphs]
+    new_time = min(timeit.repeat(lambda: [path.find_shortest_path() for path in graphs], number=1, repeat=repeats))
+    new_expanded = sum(len(a_star(path.graph_dict, path.start, path.end, manhattan)) for path in graphs)
+    dijkstra_expanded = sum(len(a_star(path.graph_dict, path.start, path.end, zero)) for path in graphs)
+
+    if [length for length, expanded in old_results] != new_lengths:
+        raise AssertionError(name + ": path lengths differ")
+
+    print(name + (" (simplified)" if simplified else "") + ", " + str(len(graphs)) + " graph(s)")
+    print("  nodes: " + str(sum(len(path.graph_dict) for path in graphs)) + ", shortest path length: " + str(min(new_lengths)))
+    print("  PriorityQueue A*: " + str(sum(expanded for length, expanded in old_results)) + " expanded, " + "{:.3f}".format(old_time*1000) + " ms")
+    print("  heapq A*:         " + str(new_expanded) + " expanded, " + "{:.3f}".format(new_time*1000) + " ms")
+    print("  heapq Dijkstra:   " + str(dijkstra_expanded) + " expanded")
+
+def benchmark_jps(name, maze, repeats=5):
+    """
+    (str, list of lists, int) -> NoneType
+
+    Compare A* on the unsimplified graph with Jump Point Search, 4- and 8-connected
+    Print the path lengths, expansions and time per search
+    The JPS time is for a search with the graph's cached JumpGrid, whose build time is printed separately
+    """
+
+    print(name)
+    for diagonal, heuristic in ((False, manhattan), (True, octile)):
+        path = graph(maze)
+        path.generate_nodes()
+        path.generate_graph_dict(diagonal)
+
+        a_star_length = path.find_shortest_path(heuristic)
+        a_star_expanded = len(a_star(path.graph_dict, path.start, path.end, heuristic))
+        a_star_time = min(timeit.repeat(lambda: path.find_shortest_path(heuristic), number=1, repeat=repeats))
+
+        jps_length = path.find_shortest_path_jps(diagonal)
+        jps_time = min(timeit.repeat(lambda: path.find_shortest_path_jps(diagonal), number=1, repeat=repeats))
+        grid_time = min(timeit.repeat(lambda: JumpGrid(path.nodes, path.width, path.height), number=1, repeat=repeats))
+
+        if not (a_star_length == jps_length or abs(a_star_length - jps_length) < 1e-9*a_star_length):
+            raise AssertionError(name + ": path lengths differ, " + str(a_star_length) + " != " + str(jps_length))
+
+        print("  " + ("8" if diagonal else "4") + "-connected, path length: " + "{:.3f}".format(jps_length))
+        print("    A*:  " + str(a_star_expanded) + " expanded, " + "{:.3f}".format(a_star_time*1000) + " ms")
+        print("    JPS: " + str(path.expanded) + " expanded, " + "{:.3f}".format(jps_time*1000) + " ms" +
+              " with the cached JumpGrid, which took " + "{:.3f}".format(grid_time*1000) + " ms to build")
+
+
+
+if __name__ == "__main__":
+    benchmark("Sample maze", SAMPLE_MAZE, False, one_barrier=True)
+    benchmark("Sample maze", SAMPLE_MAZE, True, one_barrier=True)
+    benchmark("Random 200x200 maze", random_maze(200, 0.25, 0), False, repeats=5)
+    benchmark("Random 200x200 maze", random_maze(200, 0.25, 0), True, repeats=5)
+    benchmark_jps("Open 300x300 grid", random_maze(300, 0, 0))
+    benchmark_jps("300x300 grid of 50x50 rooms", rooms_maze(300, 50))
@@ -0,0 +1,92 @@
+#Escape the Building Benchmark
+#18-Oct-'26
+
+#Compare the all pairs shortest path engines of escape_the_building on random prisons
+#Each prison has a given fraction of the possible corridors, some with negative times but no negative cycles, and some self-loops
+#Floyd-Warshall costs O(n^3) whatever the density while Johnson's algorithm costs O(n E log n)
+#The density at which they cross sets JOHNSON_DENSITY, or JOHNSON_DENSITY_NUMPY for the vectorised Floyd-Warshall
+
+import copy
+import random
+import time
+
+import escape_the_building
+from escape_the_building import floyd_warshall
+from escape_the_building import johnson
+
+ENGINES = {"floyd_warshall": floyd_warshall, "johnson": johnson}
+DENSITIES = [0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5]
+
+def generate_prison(num_rooms, density, seed):
+    """
+    (int, float, int) -> list of lists of ints
+
+    Generate a prison with the given fraction of corridors present and every other corridor infinite
+    Times are drawn around room potentials so some are negative yet every cycle is non-negative
+    About half the rooms get a positive corridor to themselves, which the engines must agree on as on any other corridor
+    """
+
+    generator = random.Random(seed)
+    potentials = [generator.randint(0, 50) for room in range(num_rooms)]
+    times = [[float("inf")]*num_rooms for room in range(num_rooms)]
+    for start in range(num_rooms):
+        times[start][start] = generator.choice([0, generator.randint(1, 100)])
+        for end in range(num_rooms):
+            if end != start and generator.random() < density:
+                times[start][end] = generator.randint(0, 100) + potentials[end] - potentials[start]
+    return times
+
+def time_engine(times, engine):
+    """
+    (list of lists of ints, function) -> (list of lists of ints, float)
+
+    Run one engine on a copy of the prison and return the shortest paths and the time taken in seconds
+    """
+
+    times = copy.deepcopy(times)
+    start_time = time.perf_counter()
+    dist = engine(times)
+    return (dist, time.perf_counter() - start_time)
+
+def benchmark(num_rooms, densities=DENSITIES, seed=0, pure_python=False):
+    """
+    (int, list of floats, int, bool) -> float or NoneType
+
+    Time every engine at each density, check they agree and print the times
+    With pure_python, Floyd-Warshall is run without NumPy
+    Return the lowest density at which Floyd-Warshall wins, or None if Johnson's algorithm always wins
+    """
+
+    print(str(num_rooms) + " rooms" + (", pure Python" if pure_python else ""))
+    numpy = escape_the_building.np
+    if pure_python:
+        escape_the_building.np = None
+
+    crossover = None
+    for density in densities:
+        times = generate_prison(num_rooms, density, seed)
+        results = {}
+        seconds = {}
+        for name, engine in ENGINES.items():
+            results[name], seconds[name] = time_engine(times, engine)
+
+        if results["floyd_warshall"] != results["johnson"]:
+            escape_the_building.np = numpy
+            raise AssertionError(str(num_rooms) + " rooms, density " + str(density) + ": engines disagree")
+
+        print("  density " + "{:6.3f}".format(density) + "".join("  " + name + " " + "{:9.3f}".format(seconds[name]*1000) + " ms" for name in ENGINES))
+        if crossover is None and seconds["floyd_warshall"] < seconds["johnson"]:
+            crossover = density
+
+    escape_the_building.np = numpy
+    print("  Floyd-Warshall wins from density " + str(crossover))
+    return crossover
+
+
+
+if __name__ == "__main__":
+    benchmark(100, pure_python=True)
+    benchmark(200, pure_python=True)
+    benchmark(100)
+    benchmark(300)
+    benchmark(600)
@@ -0,0 +1,90 @@
+#Max Flow Benchmark
+#18-Oct-'26
+
+#Compare the max flow engines of escaping_and_max_flows on generated buildings
+#Dense buildings have corridors between most pairs of rooms and many entrances and exits
+#Sparse buildings have a few corridors per room
+#Wide-range buildings draw capacities log-uniformly up to the billions, the case capacity scaling targets
+#Each engine gets a freshly built residual graph so only the max flow itself is timed
+
+import random
+import time
+
+from escaping_and_max_flows import ResidualGraph
+from escaping_and_max_flows import max_flow
+
+METHODS = ["dinic", "scaling", "push_relabel"]
+
+def generate_building(num_rooms, corridors_per_room, num_entrances, num_exits, max_capacity, seed, wide_range=False):
+    """
+    (int, int, int, int, int, int, bool) -> (list of ints, list of ints, list of tuples)
+
+    Generate random entrances, exits and corridors (start room, end room, capacity)
+    Capacities are uniform up to max_capacity, or log-uniform if wide_range is set
+    """
+
+    generator = random.Random(seed)
+    rooms = list(range(num_rooms))
+    generator.shuffle(rooms)
+    entrances = rooms[:num_entrances]
+    exits = rooms[num_entrances:num_entrances + num_exits]
+
+    corridors = []
+    for start_room in range(num_rooms):
+        for end_room in generator.sample(range(num_rooms), corridors_per_room):
+            if end_room != start_room:
+                if wide_range:
+                    capacity = int(max_capacity**generator.random())
+                else:
+                    capacity = generator.randint(1, max_capacity)
+                corridors.append((start_room, end_room, capacity))
+    return (entrances, exits, corridors)
+
+def time_method(num_rooms, building, method):
+    """
+    (int, tuple, str) -> (int, float)
+
+    Build the residual graph of a building and time one max flow with the given method
+    Return the flow and the time taken in seconds
+    """
+
+    entrances, exits, corridors = building
+    network = ResidualGraph(num_rooms)
+    for start_room, end_room, capacity in corridors:
+        network.add_edge(start_room, end_room, capacity)
+
+    start_time = time.perf_counter()
+    flow = max_flow(network, entrances, exits, method)
+    return (flow, time.perf_counter() - start_time)
+
+def benchmark(name, num_rooms, corridors_per_room, num_entrances, num_exits, max_capacity, methods=METHODS, seed=0, wide_range=False):
+    """
+    (str, int, int, int, int, int, list of str, int, bool) -> dict
+
+    Run every method on one generated building, check they agree and print the times
+    Return a dict of method -> time in seconds
+    """
+
+    building = generate_building(num_rooms, corridors_per_room, num_entrances, num_exits, max_capacity, seed, wide_range)
+    print(name + ": " + str(num_rooms) + " rooms, " + str(len(building[2])) + " corridors")
+
+    flows = {}
+    times = {}
+    for method in methods:
+        flows[method], times[method] = time_method(num_rooms, building, method)
+        print("  " + method.ljust(14) + "{:10.3f}".format(times[method]*1000) + " ms  flow " + str(flows[method]))
+
+    if len(set(flows.values())) != 1:
+        raise AssertionError(name + ": engines disagree " + str(flows))
+    return times
+
+
+
+if __name__ == "__main__":
+    benchmark("Dense", 300, 250, 60, 60, 1000)
+    benchmark("Dense, few terminals", 300, 250, 2, 2, 1000)
+    benchmark("Sparse", 20000, 5, 50, 50, 1000)
+    benchmark("Sparse, many terminals", 20000, 5, 2000, 2000, 1000)
+    benchmark("Dense, wide range", 300, 250, 60, 60, 10**9, wide_range=True)
+    benchmark("Sparse, wide range", 20000, 5, 50, 50, 10**9, wide_range=True)
+    benchmark("Sparse, few terminals, wide range", 20000, 3, 5, 5, 10**9, wide_range=True)
@@ -0,0 +1,208 @@
+#Sieve Benchmark
+#18-Oct-'26
+
+#Time the prime sieves of sieve_of_atkin for limits from 10^4 to 10^9
+#Every run happens in a fresh interpreter so its peak RSS belongs to that engine alone
+#Each engine reports the number of primes up to the limit and, where it produces them, their sum
+#Both are checked against a reference Sieve of Eratosthenes run the same way
+#Results are written as JSON so runs from different versions can be compared with compare()
+
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import compress
+
+import sieve_of_atkin
+
+LIMITS = [10**exponent for exponent in range(4, 10)]
+
+#Largest limit each engine is run at, keeping the pure Python and list-building engines to a sensible time and memory
+MAX_LIMITS = {
+    "eratosthenes": 10**9,
+    "atkin": 10**7,
+    "atkin_vectorized": 10**8,
+    "segmented": 10**9,
+    "parallel": 10**9,
+    "prime_table": 10**9,
+}
+
+def eratosthenes(limit):
+    """
+    (int) -> (int, int)
+
+    Reference Sieve of Eratosthenes over the odd numbers up to limit
+    Return the number of primes and their sum
+    """
+
+    if limit < 2:
+        return (0, 0)
+
+    #Index i stands for the odd number 2i+1
+    odd = bytearray(b"\x01")*(limit//2 + limit % 2)
+    odd[0] = 0
+    for i in range(1, (math.isqrt(limit) - 1)//2 + 1):
+        if odd[i]:
+            p = 2*i + 1
+            odd[p*p//2::p] = bytes(len(range(p*p//2, len(odd), p)))
+
+    count = 1 + odd.count(1)
+    total = 2 + sum(2*i + 1 for i in compress(range(len(odd)), odd))
+    return (count, total)
+
+def atkin(limit):
+    """
+    (int) -> (int, int)
+
+    The original SieveOfAtkin
+    """
+
+    primes = [p for p in sieve_of_atkin.SieveOfAtkin(limit) if p <= limit]
+    return (len(primes), sum(primes))
+
+def atkin_vectorized(limit):
+    """
+    (int) -> (int, int)
+
+    The NumPy kernel SieveOfAtkinVectorized
+    """
+
+    primes = sieve_of_atkin.SieveOfAtkinVectorized(limit)
+    return (len(primes), sum(primes))
+
+def segmented(limit):
+    """
+    (int) -> (int, int)
+
+    The streaming segmented_sieve, consuming the primes as they are generated
+    """
+
+    count = 0
+    total = 0
+    for p in sieve_of_atkin.segmented_sieve(0, limit + 1):
+        count += 1
+        total += p
+    return (count, total)
+
+def parallel(limit):
+    """
+    (int) -> (int, NoneType)
+
+    The process pool parallel_prime_count on every core
+    """
+
+    return (sieve_of_atkin.parallel_prime_count(0, limit + 1), None)
+
+def prime_table(limit):
+    """
+    (int) -> (int, NoneType)
+
+    Build a PrimeTable in a temporary file and count the primes with prime_pi
+    """
+
+    with tempfile.TemporaryDirectory() as directory:
+        with sieve_of_atkin.PrimeTable.build(os.path.join(directory, "primes.bin"), limit) as table:
+            return (table.prime_pi(limit), None)
+
+ENGINES = {
+    "eratosthenes": eratosthenes,
+    "atkin": atkin,
+    "atkin_vectorized": atkin_vectorized,
+    "segmented": segmented,
+    "parallel": parallel,
+    "prime_table": prime_table,
+}
+
+def run_child(engine, limit):
+    """
+    (str, int) -> dict
+
+    Run one engine in this process and return its time, peak RSS in KiB, prime count and sum
+    """
+
+    import resource
+
+    start_time = time.perf_counter()
+    count, total = ENGINES[engine](limit)
+    seconds = time.perf_counter() - start_time
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {"seconds": seconds, "peak_rss_kib": max(peak_rss, children_rss), "primes": count, "sum": total}
+
+def run_engine(engine, limit):
+    """
+    (str, int) -> dict
+
+    Run one engine in a fresh interpreter and return its measurements
+    """
+
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", engine, str(limit)],
+                               capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(completed.stdout.splitlines()[-1])
+
+def benchmark(limits=LIMITS, engines=ENGINES, output="benchmark_sieve.json"):
+    """
+    (list of ints, iterable of str, str) -> list of dicts
+
+    Run every engine at every limit up to its maximum, check it against the reference and print a line per run
+    Write the records to output as JSON and return them
+    """
+
+    records = []
+    for limit in limits:
+        reference = run_engine("eratosthenes", limit)
+        print("limit " + str(limit) + ": " + str(reference["primes"]) + " primes")
+
+        for engine in engines:
+            if limit > MAX_LIMITS[engine]:
+                continue
+            result = reference if engine == "eratosthenes" else run_engine(engine, limit)
+            correct = result["primes"] == reference["primes"] and result["sum"] in (None, reference["sum"])
+            records.append({
+                "engine": engine,
+                "limit": limit,
+                "seconds": result["seconds"],
+                "peak_rss_kib": result["peak_rss_kib"],
+                "primes": result["primes"],
+                "primes_per_second": result["primes"]/result["seconds"] if result["seconds"] > 0 else None,
+                "correct": correct,
+            })
+            print("  " + engine.ljust(18) + "{:10.3f}".format(result["seconds"]*1000) + " ms" +
+                  "{:10.1f}".format(result["peak_rss_kib"]/1024) + " MiB" + ("" if correct else "  WRONG"))
+
+    with open(output, "w") as output_file:
+        json.dump({"python": sys.version, "records": records}, output_file, indent=1)
+    return records
+
+def compare(old_output, new_output):
+    """
+    (str, str) -> NoneType
+
+    Print the time and peak RSS ratios, new over old, of the runs two benchmark JSON files have in common
+    """
+
+    with open(old_output) as old_file:
+        old_records = {(record["engine"], record["limit"]): record for record in json.load(old_file)["records"]}
+    with open(new_output) as new_file:
+        new_records = json.load(new_file)["records"]
+
+    for record in new_records:
+        old = old_records.get((record["engine"], record["limit"]))
+        if old is not None:
+            print(record["engine"].ljust(18) + str(record["limit"]).rjust(12) +
+                  "  time x" + "{:.2f}".format(record["seconds"]/old["seconds"]) +
+                  "  rss x" + "{:.2f}".format(record["peak_rss_kib"]/old["peak_rss_kib"]))
+
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        print(json.dumps(run_child(sys.argv[2], int(sys.argv[3]))))
+    elif len(sys.argv) == 3:
+        compare(sys.argv[1], sys.argv[2])
+    else:
+        benchmark(output=sys.argv[1] if len(sys.argv) > 1 else "benchmark_sieve.json")
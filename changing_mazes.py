@@ -7,7 +7,37 @@
 #The top left and bottom right of the map are the entrance and exits respectively and are hence both zeros
 #Find the shortest path through the maze where any one barrier can be changed to a corridor
 
-from queue import PriorityQueue
+import mmap
+import tempfile
+from array import array
+from collections import Counter
+from collections import OrderedDict
+from heapq import heapify
+from heapq import heappop
+from heapq import heappush
+from itertools import count
+from math import sqrt
+
+from a_star import a_star
+from a_star import manhattan
+from a_star import octile
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+#Byte translation table swapping corridors (0) and barriers (1)
+INVERT_CELLS = bytes([1, 0]) + bytes(254)
+
+#Byte translation from one packed byte to its 8 cells, most significant bit first
+UNPACK_BITS = [bytes((byte >> shift) & 1 for shift in range(7, -1, -1)) for byte in range(256)]
+
+#Byte translation from one cell per byte to the binary digits of a row
+BIT_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+
+#Distance field entry for a state that cannot be reached
+UNREACHED = 2**31 - 1
 
 class graph:
     def __init__(self, maze_list):
@@ -24,6 +54,19 @@ class graph:
         self.barriers = set()
         self.graph_dict = {}
 
+        #Contracted corridors: edge key -> [edge key, cells], and cell -> record
+        self.corridors = {}
+        self.corridor_of = {}
+
+        #Cached shortest path tree, built by find_shortest_path_incremental()
+        self.sp_distance = None
+        self.sp_parent = {}
+        self.sp_children = {}
+
+        #Cached JumpGrid of the nodes, built by find_shortest_path_jps(), and the jump points its last search expanded
+        self.jump_grid = None
+        self.expanded = None
+
     def __str__(self):
         """
         (graph) -> str
@@ -45,6 +88,7 @@ class graph:
             for y in range(self.height):
                 if self.maze_list[y][x] == 0:
                     self.nodes.add((x, y))
+        self.jump_grid = None
 
     def add_node(self, pos):
         """
@@ -54,6 +98,7 @@ class graph:
         """
 
         self.nodes.add(pos)
+        self.jump_grid = None
 
     def generate_barriers(self):
         """
@@ -92,18 +137,25 @@ class graph:
             if num_neighbours < 2:
                 self.barriers.remove(barrier)
 
-    def generate_graph_dict(self):
+    def generate_graph_dict(self, diagonal=False):
         """
-        (graph) -> NoneType
+        (graph, bool) -> NoneType
 
         From the positions of the nodes, create a graph represented as a dict of dicts
         The parent key represents the position of the node in consideration
         The associated dictionary has keys corresponding to the positions of the successors and values corresponding to the respective weights
-        For now, all weights are 1 as we can only move to adjacent grid squares
+        All weights are 1 as we can only move to adjacent grid squares
+        With diagonal, diagonal moves that do not cut the corner of a barrier are added with weight sqrt(2)
+        set_cell() only supports the 4-connected graph
 
         We must generate_nodes before calling generate_graph_dict
         """
 
+        self.graph_dict = {}
+        self.corridors = {}
+        self.corridor_of = {}
+        self.sp_distance = None
+
         for node in self.nodes:
             x, y = node
             neighbours = {}
@@ -115,6 +167,10 @@ class graph:
                 neighbours[(x,y+1)] = 1
             if (x,y-1) in self.nodes:
                 neighbours[(x,y-1)] = 1
+            if diagonal:
+                for dx, dy in ((1,1), (1,-1), (-1,1), (-1,-1)):
+                    if (x+dx,y+dy) in self.nodes and (x+dx,y) in self.nodes and (x,y+dy) in self.nodes:
+                        neighbours[(x+dx,y+dy)] = sqrt(2)
 
             self.graph_dict[(x,y)] = neighbours
 
@@ -141,11 +197,58 @@ class graph:
         #Keep a copy of the original nodes to see if the algorithm simplified the graph
         nodes_before_simplify = self.nodes.copy()
 
+        self.simplify_nodes(list(self.graph_dict))
+
+        #Return False only if the nodes haven't changed, indicating there's no need for re-running simplify()
+        return self.nodes != nodes_before_simplify
+
+    def contract(self):
+        """
+        (graph) -> NoneType
+
+        Run simplify() until the graph stops changing
+        The contracted graph is a persistent index: self.corridor_of maps every absorbed cell onto its contracted edge
+        set_cell() then keeps it up to date by re-contracting only the corridors around a change
+
+        Must generate graph dictionary and nodes before running contract
+        """
+
+        repeat = True
+        while repeat:
+            repeat = self.simplify()
+
+    def contracted_edge(self, pos):
+        """
+        (graph, tuple) -> tuple of tuples
+
+        Return the (node, node) edge whose corridor absorbed the cell at pos
+        Return None if pos is still a node, a barrier or a dead end removed by simplify()
+        """
+
+        record = self.corridor_of.get(pos)
+        return None if record is None else record[0]
+
+    def simplify_nodes(self, node_list):
+        """
+        (graph, list of tuples) -> set of tuples
+
+        Run the three steps of simplify() on the given nodes only
+        The cells removed by step 3 are recorded against the contracted edge that replaces them in self.corridors
+        This lets set_cell() restore a corridor without regenerating the whole graph
+        Return the nodes whose edges changed, including those removed
+        """
+
+        changed = set()
+        self.jump_grid = None
+
         #To avoid the start or end being removed, they are not considered here
-        node_list = [node for node in self.graph_dict if node != self.start and node != self.end]
+        node_list = [node for node in node_list if node in self.graph_dict and node != self.start and node != self.end]
 
         for current_node in node_list:
             successors = [succ for succ in self.graph_dict[current_node]]
+            if len(successors) < 3:
+                changed.add(current_node)
+                changed.update(successors)
 
             if len(successors) == 0:
                 #Ignore nodes with no connections. They won't contribute to the solution
@@ -154,6 +257,8 @@ class graph:
 
             elif len(successors) == 1:
                 #Having only one edge means the node would be a dead end so we can remove it
+                #Any corridor leading to it is a dead end too
+                self.drop_corridor(current_node, successors[0])
                 self.graph_dict[successors[0]].pop(current_node)
                 self.graph_dict.pop(current_node)
                 self.nodes.remove(current_node)
@@ -169,6 +274,12 @@ class graph:
                 #Check to see if there already exists an edge between the two successors
                 is_edge = succ2 in {key for key in self.graph_dict[succ1].keys()}
 
+                #The cells of both corridors through the current node are merged with any existing corridor between the successors
+                corridor_records = [self.corridors.pop(edge_key(current_node, succ1), None),
+                                    self.corridors.pop(edge_key(current_node, succ2), None),
+                                    self.corridors.pop(edge_key(succ1, succ2), None)]
+                self.merge_corridors(edge_key(succ1, succ2), corridor_records, [current_node])
+
                 #If the edge exists and has a lower weight, we can ignore the new path
                 if is_edge and self.graph_dict[succ1][succ2] < new_weight:
 
@@ -191,118 +302,1365 @@ class graph:
                     self.graph_dict.pop(current_node)
                     self.nodes.remove(current_node)
 
-        #Return False only if the nodes haven't changed, indicating there's no need for re-running simplify()
-        return self.nodes != nodes_before_simplify
+        return changed
 
-    def find_shortest_path(self):
+    def merge_corridors(self, key, corridor_records, cells):
+        """
+        (graph, tuple, list of lists, list of tuples) -> NoneType
+
+        Combine corridor records and extra cells into one record for the edge key
+        A record is a list [edge key, cells]. The smaller records are moved into the largest so each cell is relabelled O(log n) times
+        """
+
+        corridor_records = [record for record in corridor_records if record is not None]
+        if corridor_records:
+            target = max(corridor_records, key=lambda record: len(record[1]))
+        else:
+            target = [key, []]
+
+        for record in corridor_records:
+            if record is not target:
+                for cell in record[1]:
+                    self.corridor_of[cell] = target
+                target[1].extend(record[1])
+
+        for cell in cells:
+            self.corridor_of[cell] = target
+        target[1].extend(cells)
+
+        target[0] = key
+        self.corridors[key] = target
+
+    def drop_corridor(self, node1, node2):
+        """
+        (graph, tuple, tuple) -> NoneType
+
+        Forget the corridor between two nodes, leaving its cells as removed dead ends
+        """
+
+        record = self.corridors.pop(edge_key(node1, node2), None)
+        if record is not None:
+            for cell in record[1]:
+                self.corridor_of.pop(cell)
+
+    def expand_corridor(self, record, new_nodes, changed):
+        """
+        (graph, list, set of tuples, set of tuples) -> NoneType
+
+        Undo the contraction of a corridor: remove its edge and add its cells to new_nodes
+        """
+
+        node1, node2 = record[0]
+        self.corridors.pop(record[0])
+        self.graph_dict[node1].pop(node2, None)
+        self.graph_dict[node2].pop(node1, None)
+
+        #Cells merged into a corridor between neighbouring nodes leave their direct edge in place
+        if distance(node1, node2) == 1:
+            self.graph_dict[node1][node2] = 1
+            self.graph_dict[node2][node1] = 1
+        changed.add(node1)
+        changed.add(node2)
+
+        for cell in record[1]:
+            self.corridor_of.pop(cell)
+            new_nodes.add(cell)
+
+    def grid_neighbours(self, pos):
+        """
+        (graph, tuple) -> list of tuples
+
+        Return the positions of the corridor cells next to pos
+        """
+
+        x, y = pos
+        neighbours = []
+        for neighbour in ((x+1,y), (x-1,y), (x,y+1), (x,y-1)):
+            neighbour_x, neighbour_y = neighbour
+            if 0 <= neighbour_x < self.width and 0 <= neighbour_y < self.height and self.maze_list[neighbour_y][neighbour_x] == 0:
+                neighbours.append(neighbour)
+        return neighbours
+
+    def set_cell(self, x, y, value):
+        """
+        (graph, int, int, int) -> NoneType
+
+        Change the cell (x,y) to a corridor (0) or a barrier (1) and patch the graph locally
+        Contracted corridors touching the cell are expanded back into nodes
+        When opening a cell, dead ends that simplify() removed next to it are restored as they may now lead somewhere
+        The affected nodes are then simplified again and any cached shortest path tree is repaired
+
+        Must generate graph dictionary and nodes before calling set_cell
+        """
+
+        pos = (x, y)
+        if self.maze_list[y][x] == value:
+            return
+        self.maze_list[y][x] = value
+        self.jump_grid = None
+
+        new_nodes = set()
+        changed = set()
+        if pos in self.corridor_of:
+            self.expand_corridor(self.corridor_of[pos], new_nodes, changed)
+
+        if value == 0:
+            self.barriers.discard(pos)
+            new_nodes.add(pos)
+
+            #Flood fill the removed cells around the new corridor, expanding any contracted corridors they touch
+            stack = [pos]
+            while stack:
+                cell = stack.pop()
+                for neighbour in self.grid_neighbours(cell):
+                    if neighbour in self.corridor_of:
+                        self.expand_corridor(self.corridor_of[neighbour], new_nodes, changed)
+                    elif neighbour not in self.graph_dict and neighbour not in new_nodes:
+                        new_nodes.add(neighbour)
+                        stack.append(neighbour)
+
+        else:
+            self.barriers.add(pos)
+            new_nodes.discard(pos)
+            if pos in self.graph_dict:
+                for neighbour in self.graph_dict.pop(pos):
+                    self.drop_corridor(pos, neighbour)
+                    self.graph_dict[neighbour].pop(pos)
+                    changed.add(neighbour)
+                self.nodes.discard(pos)
+            changed.add(pos)
+
+        #Connect the new nodes to their neighbours with unit edges
+        stack = list(new_nodes)
+        for node in stack:
+            self.graph_dict[node] = {}
+            self.nodes.add(node)
+        while stack:
+            node = stack.pop()
+            changed.add(node)
+            for neighbour in self.grid_neighbours(node):
+                if neighbour in self.corridor_of:
+                    expanded = set()
+                    self.expand_corridor(self.corridor_of[neighbour], expanded, changed)
+                    for cell in expanded:
+                        self.graph_dict[cell] = {}
+                        self.nodes.add(cell)
+                    stack.extend(expanded)
+                if neighbour in self.graph_dict:
+                    self.graph_dict[node][neighbour] = 1
+                    self.graph_dict[neighbour][node] = 1
+                    changed.add(neighbour)
+
+        #Simplify around the change until it stops changing
+        candidates = set(changed)
+        while candidates:
+            simplified = self.simplify_nodes(list(candidates))
+            changed.update(simplified)
+            candidates = {node for node in simplified if node in self.graph_dict}
+
+        if self.sp_distance is not None:
+            self.repair_shortest_paths(changed)
+
+    def shortest_path_tree(self):
+        """
+        (graph) -> NoneType
+
+        Dijkstra's algorithm from the start over the whole graph
+        Store the distance, parent and children of every reachable node so set_cell() can repair them later
+        """
+
+        self.sp_distance = {}
+        self.sp_parent = {}
+        self.sp_children = {}
+        if self.start not in self.graph_dict:
+            return
+
+        self.sp_distance[self.start] = 0
+        self.sp_children[self.start] = set()
+        self.propagate_distances([(0, self.start)])
+
+    def propagate_distances(self, heap):
+        """
+        (graph, list of tuples) -> NoneType
+
+        Relax edges out of the (distance, node) entries in the heap until no distance improves
+        Entries whose distance has since improved are skipped
+        """
+
+        heapify(heap)
+        while heap:
+            node_distance, node = heappop(heap)
+            if node_distance > self.sp_distance.get(node, float("inf")):
+                continue
+
+            for neighbour, weight in self.graph_dict[node].items():
+                new_distance = node_distance + weight
+                if new_distance < self.sp_distance.get(neighbour, float("inf")):
+                    old_parent = self.sp_parent.get(neighbour)
+                    if old_parent is not None:
+                        self.sp_children[old_parent].discard(neighbour)
+                    self.sp_distance[neighbour] = new_distance
+                    self.sp_parent[neighbour] = node
+                    self.sp_children[node].add(neighbour)
+                    self.sp_children.setdefault(neighbour, set())
+                    heappush(heap, (new_distance, neighbour))
+
+    def repair_shortest_paths(self, changed):
+        """
+        (graph, set of tuples) -> NoneType
+
+        Update the shortest path tree after the edges of the changed nodes were modified
+        Nodes whose tree path used a removed node or a modified edge lose their distance, along with their subtrees
+        They are re-seeded from their remaining neighbours and all changed nodes are relaxed again
+        Only the nodes whose distance can change are visited
+        """
+
+        if self.start not in self.graph_dict or self.start not in self.sp_distance:
+            self.shortest_path_tree()
+            return
+
+        #Find the subtrees hanging from removed nodes, modified tree edges and new nodes
+        invalid_roots = []
+        for node in changed:
+            if node not in self.graph_dict or node not in self.sp_distance:
+                invalid_roots.append(node)
+            elif node != self.start:
+                parent = self.sp_parent[node]
+                if parent not in self.graph_dict or self.graph_dict[parent].get(node) != self.sp_distance[node] - self.sp_distance[parent]:
+                    invalid_roots.append(node)
+
+        invalid = set()
+        while invalid_roots:
+            node = invalid_roots.pop()
+            if node not in invalid:
+                invalid.add(node)
+                invalid_roots.extend(self.sp_children.get(node, ()))
+
+        for node in invalid:
+            parent = self.sp_parent.pop(node, None)
+            if parent is not None and parent not in invalid:
+                self.sp_children[parent].discard(node)
+            self.sp_distance.pop(node, None)
+            self.sp_children.pop(node, None)
+
+        #Re-seed the invalidated nodes from their valid neighbours
+        heap = []
+        for node in invalid:
+            if node in self.graph_dict:
+                self.sp_children[node] = set()
+                for neighbour, weight in self.graph_dict[node].items():
+                    if neighbour in self.sp_distance and self.sp_distance[neighbour] + weight < self.sp_distance.get(node, float("inf")):
+                        self.sp_distance[node] = self.sp_distance[neighbour] + weight
+                        self.sp_parent[node] = neighbour
+                if node in self.sp_distance:
+                    self.sp_children[self.sp_parent[node]].add(node)
+                    heap.append((self.sp_distance[node], node))
+
+        #Valid changed nodes may now offer shorter paths through new or cheaper edges
+        for node in changed:
+            if node in self.sp_distance and node not in invalid:
+                heap.append((self.sp_distance[node], node))
+
+        self.propagate_distances(heap)
+
+    def find_shortest_path_incremental(self):
         """
         (graph) -> int
 
+        Return the number of steps from the start to end +1 from the cached shortest path tree
+        The tree is built on the first call and then kept up to date by set_cell()
+        """
+
+        if self.sp_distance is None:
+            self.shortest_path_tree()
+        return self.sp_distance.get(self.end, float("inf")) + 1
+
+    def find_shortest_path(self, heuristic=manhattan):
+        """
+        (graph, function) -> int
+
         A* algorithm is used with 1D distance as the heuristic to solve the graph
-        Algorithm implemented as standard but with no track kept of the predecessor nodes
+        The heap-based engine in a_star keeps a closed set so no node is expanded twice
+        Other heuristics from a_star can be passed e.g. zero for Dijkstra's algorithm
         Return the number of steps from the start to end +1
 
         Must have generated nodes and graph dictionary to solve
         """
 
-        #The open set tracks the nodes with non-inf g_scores that have not yet been considered
-        open_queue = PriorityQueue()
+        g_score = a_star(self.graph_dict, self.start, self.end, heuristic)
+        return g_score.get(self.end, float("inf")) + 1
+
+    def find_shortest_path_jps(self, diagonal=False):
+        """
+        (graph, bool) -> float
+
+        Jump Point Search over self.nodes, moving in 4 directions or, with diagonal, in 8
+        Gives the same length as find_shortest_path() on the matching unsimplified graph while expanding far fewer nodes in open areas
+        The JumpGrid of self.nodes costs O(cells) to build, so it is kept until the nodes change
+        The first search on an open grid is still slower than A*, which expands few nodes there; later searches are not
+        See benchmark_a_star.py
+        The number of expanded jump points is stored in self.expanded
+        Return the path cost from the start to end +1
+
+        Must have generated nodes to solve. The graph dictionary is not used
+        """
+
+        if self.jump_grid is None:
+            self.jump_grid = JumpGrid(self.nodes, self.width, self.height)
+        g_score = jump_point_search(self.jump_grid, self.start, self.end, diagonal)
+        self.expanded = len(g_score)
+        return g_score.get(self.end, float("inf")) + 1
+
+class GridGraph:
+    def __init__(self, maze_list):
+        """
+        (GridGraph, list of lists) -> NoneType
+
+        Compact counterpart of the graph class for very large mazes
+        Cells are stored row by row in a bytearray and identified by the integer id y*width + x
+        Nodes and barriers are bytearray masks over these ids and adjacency is implicit: the up to 4 neighbouring ids
+        This costs a few bytes per cell instead of the sets and dicts of tuples used by graph
+        It offers the same generate_nodes, generate_graph_dict, simplify and find_shortest_path steps
+        Corridors are never contracted, so the corridor index and shortest path tree methods of graph are not provided
+        """
+
+        self.set_cells(flatten_maze(maze_list), len(maze_list[0]), len(maze_list))
+
+    @classmethod
+    def from_cells(cls, cells, width, height):
+        """
+        (type, bytes-like, int, int) -> GridGraph
+
+        Build the grid directly from one byte per cell, row by row, without going through a list of lists
+        A NumPy uint8 array can be passed as it supports the buffer protocol
+        """
+
+        grid = cls.__new__(cls)
+        grid.set_cells(bytearray(cells), width, height)
+        return grid
+
+    def set_cells(self, cells, width, height):
+        """
+        (GridGraph, bytearray, int, int) -> NoneType
+
+        Store the flattened maze and reset the node and barrier masks
+        """
+
+        if len(cells) != width*height:
+            raise ValueError("Expected " + str(width*height) + " cells, got " + str(len(cells)))
+
+        self.maze_list = None
+        self.cells = cells
+        self.width = width
+        self.height = height
+        self.start = 0
+        self.end = width*height - 1
+        self.nodes = bytearray(len(cells))
+        self.barriers = bytearray(len(cells))
+        self.graph_dict = {}
+
+    def __str__(self):
+        """
+        (GridGraph) -> str
+
+        Print basic information: graph dimensions and number of nodes
+        """
+
+        return "Dimensions: " + str(self.width) + "x" + str(self.height) + "\nNodes: " + str(self.nodes.count(1))
+
+    def cell_id(self, pos):
+        """
+        (GridGraph, tuple or int) -> int
+
+        Convert an (x,y) position to its cell id. Ids are returned unchanged
+        """
+
+        if isinstance(pos, tuple):
+            x, y = pos
+            return y*self.width + x
+        return pos
+
+    def generate_nodes(self):
+        """
+        (GridGraph) -> NoneType
+
+        Mark every corridor cell in the node mask
+        """
+
+        self.nodes = self.cells.translate(INVERT_CELLS)
+
+    def add_node(self, pos):
+        """
+        (GridGraph, tuple or int) -> NoneType
+
+        Add a node by it's (x,y) position or cell id
+        """
+
+        self.nodes[self.cell_id(pos)] = 1
+
+    def generate_barriers(self):
+        """
+        (GridGraph) -> NoneType
+
+        Mark every barrier cell in the barrier mask
+        """
+
+        self.barriers = bytearray(self.cells)
+
+    def remove_irrelevant_barriers(self):
+        """
+        (GridGraph) -> NoneType
+
+        As in graph, keep only barriers with 2 or more corridors as neighbours
+        Rows are scanned in order; with NumPy available, blocks of rows are counted at once
+        """
+
+        if np is not None:
+            self._remove_irrelevant_barriers_numpy()
+            return
+
+        width = self.width
+        cells = self.cells
+        barriers = self.barriers
+        for y in range(self.height):
+            row_start = y*width
+            row_end = row_start + width
+            cell = barriers.find(1, row_start, row_end)
+            while cell != -1:
+                x = cell - row_start
+                num_neighbours = 0
+                if x+1 < width and cells[cell+1] == 0:
+                    num_neighbours += 1
+                if x > 0 and cells[cell-1] == 0:
+                    num_neighbours += 1
+                if y+1 < self.height and cells[cell+width] == 0:
+                    num_neighbours += 1
+                if y > 0 and cells[cell-width] == 0:
+                    num_neighbours += 1
+
+                if num_neighbours < 2:
+                    barriers[cell] = 0
+                cell = barriers.find(1, cell+1, row_end)
+
+    def _remove_irrelevant_barriers_numpy(self, block_rows=1024):
+        """
+        (GridGraph, int) -> NoneType
+
+        Vectorised remove_irrelevant_barriers() working on views of the bytearrays, block_rows rows at a time
+        """
+
+        grid = np.frombuffer(self.cells, dtype=np.uint8).reshape(self.height, self.width)
+        barriers = np.frombuffer(self.barriers, dtype=np.uint8).reshape(self.height, self.width)
+        for top in range(0, self.height, block_rows):
+            bottom = min(top + block_rows, self.height)
+            corridors = 1 - grid[top:bottom]
+            num_neighbours = np.zeros(corridors.shape, dtype=np.uint8)
+            num_neighbours[:, :-1] += corridors[:, 1:]
+            num_neighbours[:, 1:] += corridors[:, :-1]
+            num_neighbours[:-1] += corridors[1:]
+            num_neighbours[1:] += corridors[:-1]
+            if top > 0:
+                num_neighbours[0] += 1 - grid[top-1]
+            if bottom < self.height:
+                num_neighbours[-1] += 1 - grid[bottom]
+            barriers[top:bottom][num_neighbours < 2] = 0
+
+    def set_cell(self, x, y, value):
+        """
+        (GridGraph, int, int, int) -> NoneType
+
+        Change the cell (x,y) to a corridor (0) or a barrier (1)
+        Adjacency is implicit so only the flat maze and the masks change
+        The barrier mask is left as remove_irrelevant_barriers() would leave it: the relevance of the cell and its
+        neighbours, the only barriers whose count of corridor neighbours can change, is recomputed
+        """
+
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError("Cell (" + str(x) + "," + str(y) + ") is outside the " + str(self.width) + "x" + str(self.height) + " grid")
+
+        cell = y*self.width + x
+        self.cells[cell] = value
+        self.nodes[cell] = 1 - value
+        for neighbour in [cell] + self.neighbours(cell):
+            self.barriers[neighbour] = self.cells[neighbour] == 1 and self.corridor_neighbours(neighbour) >= 2
+
+    def neighbours(self, cell):
+        """
+        (GridGraph, int) -> list of ints
+
+        Return the ids of the up to 4 cells next to a cell, whether corridors or barriers
+        """
+
+        x = cell % self.width
+        result = []
+        if x+1 < self.width:
+            result.append(cell+1)
+        if x > 0:
+            result.append(cell-1)
+        if cell+self.width < len(self.cells):
+            result.append(cell+self.width)
+        if cell >= self.width:
+            result.append(cell-self.width)
+        return result
+
+    def corridor_neighbours(self, cell):
+        """
+        (GridGraph, int) -> int
+
+        Return the number of corridors next to a cell
+        """
+
+        return sum(1 for neighbour in self.neighbours(cell) if self.cells[neighbour] == 0)
+
+    def iter_barriers(self):
+        """
+        (GridGraph) -> generator of ints
+
+        Yield the cell ids of the barriers in row order
+        """
+
+        cell = self.barriers.find(1)
+        while cell != -1:
+            yield cell
+            cell = self.barriers.find(1, cell+1)
+
+    def generate_graph_dict(self):
+        """
+        (GridGraph) -> NoneType
+
+        Adjacency is implicit in grid mode so there is nothing to generate
+        """
+
+    def simplify(self):
+        """
+        (GridGraph) -> bool
+
+        Corridors are not contracted in grid mode. Return False so loops calling simplify() stop straight away
+        """
+
+        return False
+
+    def find_shortest_path(self):
+        """
+        (GridGraph) -> int
+
+        Breadth-first search over the node mask, as every edge has weight 1
+        Return the number of steps from the start to end +1, or inf if the end cannot be reached
+        """
+
+        return removals_search(self.nodes.translate(INVERT_CELLS), self.width, self.height, self.start, self.end, 0)
+
+class MazeIndex:
+    def __init__(self, maze_list, max_removals=1, cache_bytes=64*2**20):
+        """
+        (MazeIndex, list of lists, int, int) -> NoneType
+
+        Answer many shortest path queries on one maze without rebuilding it
+        A distance field is computed by BFS from each queried source and cached for later queries from or to that cell
+        Fields cover up to max_removals removed barriers, or more if a query asks for it
+        Cached fields are evicted least recently used first to keep them within cache_bytes
+        """
+
+        self.cells = flatten_maze(maze_list)
+        self.width = len(maze_list[0])
+        self.height = len(maze_list)
+        self.max_removals = max_removals
+        self.cache_bytes = cache_bytes
+        self.cached_bytes = 0
+        self.fields = OrderedDict()
+
+    def cell_id(self, pos):
+        """
+        (MazeIndex, tuple) -> int
+
+        Convert an (x,y) position to its cell id, checking it lies in the maze
+        """
+
+        x, y = pos
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError("Position " + str(pos) + " is outside the maze")
+        return y*self.width + x
+
+    def field(self, source, removals):
+        """
+        (MazeIndex, int, int) -> (int, array of ints)
+
+        Return (max removals, distance field) for the source cell, computing it if no cached field covers removals
+        """
+
+        cached = self.fields.get(source)
+        if cached is not None and cached[0] >= removals:
+            self.fields.move_to_end(source)
+            return cached
+
+        if cached is not None:
+            self.fields.pop(source)
+            self.cached_bytes -= cached[1].itemsize*len(cached[1])
+
+        max_removals = max(removals, self.max_removals)
+        field = distance_field(self.cells, self.width, self.height, source, max_removals)
+        size = field.itemsize*len(field)
+
+        #Evict the least recently used fields until the new one fits. A field larger than the whole cache is not kept
+        if size <= self.cache_bytes:
+            while self.cached_bytes + size > self.cache_bytes:
+                evicted = self.fields.popitem(last=False)[1][1]
+                self.cached_bytes -= evicted.itemsize*len(evicted)
+            self.fields[source] = (max_removals, field)
+            self.cached_bytes += size
+
+        return (max_removals, field)
+
+    def shortest_path(self, start, end, removals=0):
+        """
+        (MazeIndex, tuple, tuple, int) -> int
+
+        Produce the shortest path length between two (x,y) positions where at most removals barriers can be removed
+        As in solution(), the length counts the cells on the path and is inf if end cannot be reached
+        """
+
+        return self.shortest_paths([(start, end)], removals)[0]
+
+    def shortest_paths(self, pairs, removals=0):
+        """
+        (MazeIndex, list of tuples, int) -> list of ints
+
+        Answer a batch of (start, end) queries
+        Paths are reversible, so each query is read from a cached field of either of its ends
+        Otherwise the field is computed for whichever end appears in more of the queries
+        """
+
+        queries = [(self.cell_id(start), self.cell_id(end)) for start, end in pairs]
+        counts = Counter()
+        for start, end in queries:
+            counts[start] += 1
+            counts[end] += 1
+
+        num_cells = len(self.cells)
+        lengths = []
+        for start, end in queries:
+            source, target = start, end
+            if not self.is_cached(start, removals):
+                if self.is_cached(end, removals) or counts[end] > counts[start]:
+                    source, target = end, start
+
+            field = self.field(source, removals)[1]
+            steps = field[removals*num_cells + target]
+            lengths.append(float("inf") if steps == UNREACHED else steps + 1)
+
+        return lengths
+
+    def is_cached(self, source, removals):
+        """
+        (MazeIndex, int, int) -> bool
+
+        Check whether a cached field for the source covers removals
+        """
+
+        cached = self.fields.get(source)
+        return cached is not None and cached[0] >= removals
+
+class PackedMaze:
+    def __init__(self, path, width, height, bits=8):
+        """
+        (PackedMaze, str, int, int, int) -> NoneType
+
+        Memory-map a maze stored on disk row by row with one byte (bits=8) or one bit (bits=1) per cell
+        In the one bit format each row starts on a new byte and the first cell is the most significant bit
+        Only the pages of the tiles being read need to be resident
+        """
+
+        if bits not in (1, 8):
+            raise ValueError("bits must be 1 or 8")
+
+        self.width = width
+        self.height = height
+        self.bits = bits
+        self.row_bytes = width if bits == 8 else (width + 7)//8
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < self.row_bytes*height:
+            self.close()
+            raise ValueError("File is too small for a " + str(width) + "x" + str(height) + " maze")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        (PackedMaze) -> NoneType
+
+        Unmap and close the maze file
+        """
+
+        self.map.close()
+        self.file.close()
+
+    def read_tile(self, left, top, tile_width, tile_height):
+        """
+        (PackedMaze, int, int, int, int) -> bytearray
+
+        Return the cells of a tile as one byte per cell, row by row
+        """
+
+        tile = bytearray()
+        for y in range(top, top + tile_height):
+            row_start = y*self.row_bytes
+            if self.bits == 8:
+                tile += self.map[row_start + left:row_start + left + tile_width]
+            else:
+                first_byte = left//8
+                last_byte = (left + tile_width + 7)//8
+                unpacked = b"".join([UNPACK_BITS[byte] for byte in self.map[row_start + first_byte:row_start + last_byte]])
+                tile += unpacked[left - 8*first_byte:left - 8*first_byte + tile_width]
+        return tile
+
+class TileBorders:
+    def __init__(self, tiles_across, tiles_down, tile_size, num_layers, scratch_dir=None):
+        """
+        (TileBorders, int, int, int, int, str) -> NoneType
+
+        Best known distances across the shared edges of a grid of tiles, held in a memory-mapped scratch file
+        Each edge between two neighbouring tiles is stored once, as two blocks of tile_size*num_layers ints:
+        the distances entering the second (lower or right) tile, then those entering the first
+        Horizontal edges come first, numbered row by row, then vertical edges
+        The file starts sparse and 0 marks a border cell not reached yet, as entering a tile takes at least one step
+        The pages are backed by the file, so the kernel can write them out rather than keep every border in memory
+        """
+
+        self.tiles_across = tiles_across
+        self.tiles_down = tiles_down
+        self.block = tile_size*num_layers
+        self.vertical_start = 2*self.block*tiles_across*(tiles_down - 1)
+        size = self.vertical_start + 2*self.block*(tiles_across - 1)*tiles_down
+
+        self.file = tempfile.TemporaryFile(dir=scratch_dir)
+        self.file.truncate(4*max(size, 1))
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.values = memoryview(self.map).cast("i")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        (TileBorders) -> NoneType
+
+        Unmap and delete the scratch file
+        """
+
+        self.values.release()
+        self.map.close()
+        self.file.close()
+
+    def incoming(self, tile_x, tile_y, side):
+        """
+        (TileBorders, int, int, int) -> int
+
+        Return the index of the distances entering the tile through one side (top, bottom, left, right)
+        Return None if that side is on the edge of the maze
+        """
+
+        if side == 0:
+            return None if tile_y == 0 else self.horizontal(tile_x, tile_y - 1, 0)
+        if side == 1:
+            return None if tile_y == self.tiles_down - 1 else self.horizontal(tile_x, tile_y, 1)
+        if side == 2:
+            return None if tile_x == 0 else self.vertical(tile_x - 1, tile_y, 0)
+        return None if tile_x == self.tiles_across - 1 else self.vertical(tile_x, tile_y, 1)
+
+    def outgoing(self, tile_x, tile_y, side):
+        """
+        (TileBorders, int, int, int) -> int
+
+        Return the index of the distances leaving the tile through one side into its neighbour
+        Return None if that side is on the edge of the maze
+        """
+
+        if side == 0:
+            return None if tile_y == 0 else self.horizontal(tile_x, tile_y - 1, 1)
+        if side == 1:
+            return None if tile_y == self.tiles_down - 1 else self.horizontal(tile_x, tile_y, 0)
+        if side == 2:
+            return None if tile_x == 0 else self.vertical(tile_x - 1, tile_y, 1)
+        return None if tile_x == self.tiles_across - 1 else self.vertical(tile_x, tile_y, 0)
+
+    def horizontal(self, tile_x, tile_y, direction):
+        """
+        (TileBorders, int, int, int) -> int
+
+        Index of the edge below tile (tile_x, tile_y), entering the lower tile (0) or the upper tile (1)
+        """
+
+        return (2*(tile_y*self.tiles_across + tile_x) + direction)*self.block
+
+    def vertical(self, tile_x, tile_y, direction):
+        """
+        (TileBorders, int, int, int) -> int
 
-        #To later update values, we also need a set to track the non-inf, unconsidered nodes
-        open_set = {self.start}
+        Index of the edge right of tile (tile_x, tile_y), entering the right tile (0) or the left tile (1)
+        """
+
+        return self.vertical_start + (2*(tile_y*(self.tiles_across - 1) + tile_x) + direction)*self.block
 
-        #Initialise scores
-        #G represents the cost of the path to the start node
-        g_score = {node: float("inf") for node in self.nodes}
-        g_score[self.start] = 0
+class JumpGrid:
+    def __init__(self, nodes, width, height):
+        """
+        (JumpGrid, set of tuples, int, int) -> NoneType
 
-        #F represents the heuristic function (1D distance) from the node to the end + g
-        #This will act as our priority number
-        f_score = {node: float("inf") for node in self.nodes}
-        f_score[self.start] = distance(self.start, self.end)
+        The grid cells in nodes as one int per row and one per column, with bit x or y set for each walkable cell
+        As in JPS+, the cells where a straight jump in each direction must stop for a forced neighbour are precomputed,
+        as one more int per row and column per direction
+        An empty line is appended to each list, so it is also found at index -1 and lines at the edge need no bounds checks
+        Building visits every node, so it costs O(cells). graph keeps one until its nodes change
+        """
 
-        #Include the start in the queue
-        open_queue.put((f_score[self.start], self.start))
+        cells = bytearray(width*height)
+        for x, y in nodes:
+            cells[y*width + x] = 1
+
+        self.width = width
+        self.height = height
+        self.rows = [int(bytes(cells[y*width:(y+1)*width][::-1]).translate(BIT_DIGITS), 2) for y in range(height)] + [0]
+        self.columns = [int(bytes(cells[x::width][::-1]).translate(BIT_DIGITS), 2) for x in range(width)] + [0]
+        self.right_stops = [self.stop_mask(self.rows, y, 1) for y in range(height)] + [0]
+        self.left_stops = [self.stop_mask(self.rows, y, -1) for y in range(height)] + [0]
+        self.down_stops = [self.stop_mask(self.columns, x, 1) for x in range(width)] + [0]
+        self.up_stops = [self.stop_mask(self.columns, x, -1) for x in range(width)] + [0]
+
+    @staticmethod
+    def stop_mask(lines, line, shift):
+        """
+        (list of ints, int, int) -> int
 
-        current_node = self.start
-        while current_node != self.end:
-            #If no more nodes can be considered and we have not reached the endpoint, the graph is impossible to solve
-            if len(open_set) == 0:
-                return float("inf")
+        Return the cells of a line with a walkable side cell whose cell behind it, against a move of shift, is blocked
+        """
+
+        before = lines[line - 1]
+        after = lines[line + 1]
+        if shift > 0:
+            forced = (before & ~(before << 1)) | (after & ~(after << 1))
+        else:
+            forced = (before & ~(before >> 1)) | (after & ~(after >> 1))
+        return forced & lines[line]
+
+def edge_key(pos1, pos2):
+    """
+    (tuple, tuple) -> tuple of tuples
+
+    Order the two ends of an undirected edge so it has a single key
+    """
 
-            #Consider the node with lowest f_score
-            current_node = open_queue.get()[1]
-            open_set.remove(current_node)
+    return (pos1, pos2) if pos1 < pos2 else (pos2, pos1)
 
-            #For each of its neighbours, check if a new shorter path can be found
-            neighbours = [key for key in self.graph_dict[current_node]]
+#The distance between two grid cells, kept under its original name
+distance = manhattan
+
+def jump_point_search(grid, start, end, diagonal=False):
+    """
+    (JumpGrid, tuple, tuple, bool) -> dict
+
+    Jump Point Search over the walkable cells of a JumpGrid, moving in 4 directions or, with diagonal, in 8
+    Diagonal moves cost sqrt(2) and may not cut the corner of a barrier
+    From each expanded node the search jumps in a straight line over cells it can reach as cheaply some other way
+    It only stops at the end or at jump points, where a neighbour becomes reachable only through that cell
+    Open areas are therefore crossed in one step instead of cell by cell, giving the same path length as A*
+
+    A straight jump finds its stop or the barrier ending its run in the grid's lines with a few int operations
+    A vertical jump without diagonal moves and a diagonal jump still step cell by cell, running straight jumps at each cell
+
+    Return a dict of the expanded jump points and their distances from start, as a_star() does
+    """
+
+    rows = grid.rows
+    columns = grid.columns
+    end_x, end_y = end
+
+    def walkable(x, y):
+        return x >= 0 and (rows[y] >> x) & 1
+
+    def scan_forward(line, stops, position):
+        #Return the first stop at or after position before the run of walkable cells ends, and the end of the run
+        blocked = ~line >> position
+        run_end = position + (blocked & -blocked).bit_length() - 1
+        ahead = stops >> position
+        stop = position + (ahead & -ahead).bit_length() - 1 if ahead else run_end
+        return (stop if stop < run_end else None, run_end)
+
+    def scan_backward(line, stops, position):
+        #Return the last stop at or before position after the run of walkable cells begins, and the start of the run
+        below = (2 << position) - 1
+        run_start = (~line & below).bit_length()
+        stop = (stops & below).bit_length() - 1
+        return (stop if stop >= run_start else None, run_start)
+
+    def jump_straight(x, y, dx, dy):
+        #Move along a row or column until blocked, reaching the end or finding a forced neighbour
+        if x < 0 or y < 0:
+            return None
+        if dx != 0:
+            line = rows[y]
+            end_bit = (1 << end_x) & line if y == end_y else 0
+            if dx > 0:
+                stop = scan_forward(line, grid.right_stops[y] | end_bit, x)[0]
+            else:
+                stop = scan_backward(line, grid.left_stops[y] | end_bit, x)[0]
+            return None if stop is None else (stop, y)
+
+        line = columns[x]
+        end_bit = (1 << end_y) & line if x == end_x else 0
+        if dy > 0:
+            stop, run_end = scan_forward(line, grid.down_stops[x] | end_bit, y)
+            cells_before_stop = range(y, run_end if stop is None else stop)
+        else:
+            stop, run_start = scan_backward(line, grid.up_stops[x] | end_bit, y)
+            cells_before_stop = range(y, (run_start if stop is None else stop + 1) - 1, -1)
+
+        #Without diagonal moves, turning off a column is also a reason to stop
+        if not diagonal:
+            for cell_y in cells_before_stop:
+                if jump_straight(x+1, cell_y, 1, 0) or jump_straight(x-1, cell_y, -1, 0):
+                    return (x, cell_y)
+        return None if stop is None else (x, stop)
+
+    def jump_diagonal(x, y, dx, dy):
+        #Move diagonally until blocked, stopping wherever a straight jump would find something
+        while walkable(x, y):
+            if (x, y) == end:
+                return (x, y)
+            if jump_straight(x+dx, y, dx, 0) or jump_straight(x, y+dy, 0, dy):
+                return (x, y)
+            if not (walkable(x+dx, y) and walkable(x, y+dy)):
+                return None
+            x += dx
+            y += dy
+        return None
+
+    def directions(node, parent):
+        #The start may move in any direction. Otherwise only continue forwards or turn towards a possible forced neighbour
+        x, y = node
+        if parent is None:
+            result = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+            if diagonal:
+                result += [(dx, dy) for dx in (1, -1) for dy in (1, -1) if walkable(x+dx, y) and walkable(x, y+dy)]
+            return result
+
+        dx = (x > parent[0]) - (x < parent[0])
+        dy = (y > parent[1]) - (y < parent[1])
+        if dx != 0 and dy != 0:
+            result = [(0, dy), (dx, 0)]
+            if walkable(x, y+dy) and walkable(x+dx, y):
+                result.append((dx, dy))
+            return result
+        if not diagonal:
+            return [(dx, dy), (dy, dx), (-dy, -dx)]
+
+        result = [(dx, dy), (dy, dx), (-dy, -dx)]
+        if walkable(x+dx, y+dy):
+            for side_x, side_y in ((dy, dx), (-dy, -dx)):
+                if walkable(x+side_x, y+side_y):
+                    result.append((dx+side_x, dy+side_y))
+        return result
+
+    heuristic = octile if diagonal else manhattan
+    closed = {}
+    g_score = {start: 0}
+    parents = {start: None}
+    tie_breaker = count()
+    heap = [(heuristic(start, end), 0, next(tie_breaker), start)]
+    if not walkable(*start):
+        return closed
+
+    while heap:
+        f, negative_g, _, node = heappop(heap)
+        if node in closed:
+            continue
+
+        node_g = -negative_g
+        closed[node] = node_g
+        if node == end:
+            break
+
+        x, y = node
+        for dx, dy in directions(node, parents[node]):
+            if dx != 0 and dy != 0:
+                jump_point = jump_diagonal(x+dx, y+dy, dx, dy)
+            else:
+                jump_point = jump_straight(x+dx, y+dy, dx, dy)
+            if jump_point is None or jump_point in closed:
+                continue
+
+            new_g_score = node_g + heuristic(node, jump_point)
+            if new_g_score < g_score.get(jump_point, float("inf")):
+                g_score[jump_point] = new_g_score
+                parents[jump_point] = node
+                heappush(heap, (new_g_score + heuristic(jump_point, end), -new_g_score, next(tie_breaker), jump_point))
+
+    return closed
+
+def flatten_maze(maze):
+    """
+    (list of lists) -> bytearray
+
+    Pack the maze row by row into one byte per cell so that the cell (x, y) has the id y*width + x
+    """
+
+    cells = bytearray()
+    for row in maze:
+        cells.extend(row)
+    return cells
+
+def removals_search(cells, width, height, start, end, max_removals):
+    """
+    (bytearray, int, int, int, int, int) -> int
+
+    Breadth-first search over the states (cell id, barriers removed so far) of a flattened maze
+    Entering a barrier cell (including the start) removes it, which is allowed while at most max_removals have been removed
+    best[cell] stores the fewest removals with which the cell has been reached
+    As the search runs layer by layer, a later state is only worth expanding if it has removed fewer barriers
+    Return the number of cells on the shortest path from start to end, or inf if there is none
+    """
+
+    #Removal counts are stored in a byte per cell unless they might not fit
+    unvisited = 255 if max_removals < 255 else len(cells) + 1
+    best = array("B" if max_removals < 255 else "L", [unvisited]) * len(cells)
+
+    removed = cells[start]
+    if removed > max_removals:
+        return float("inf")
+    if start == end:
+        return 1
+    best[start] = removed
+
+    #Each frontier holds the (cell, removed) states reached with the same number of steps
+    frontier = [(start, removed)]
+    last_column = width - 1
+    length = 1
+    while frontier:
+        length += 1
+        next_frontier = []
+        for cell, removed in frontier:
+            x = cell % width
+            neighbours = []
+            if x < last_column:
+                neighbours.append(cell+1)
+            if x > 0:
+                neighbours.append(cell-1)
+            if cell + width < len(cells):
+                neighbours.append(cell+width)
+            if cell >= width:
+                neighbours.append(cell-width)
 
             for neighbour in neighbours:
-                new_g_score = g_score[current_node] + self.graph_dict[current_node][neighbour]
+                new_removed = removed + cells[neighbour]
+                if new_removed <= max_removals and new_removed < best[neighbour]:
+                    if neighbour == end:
+                        return length
+                    best[neighbour] = new_removed
+                    next_frontier.append((neighbour, new_removed))
 
-                #If a new shortest path has been found, update g, f and our queue
-                if new_g_score < g_score[neighbour]:
-                    g_score[neighbour] = new_g_score
-                    f_score[neighbour] = new_g_score + distance(neighbour, self.end)
+        frontier = next_frontier
 
-                    #We can't remove the old value from the queue so we just re-add it with a new f_score
-                    if neighbour not in open_set:
-                        open_queue.put((f_score[neighbour], neighbour))
-                        open_set.add(neighbour)
+    return float("inf")
 
-        return g_score[self.end] + 1
+def distance_field(cells, width, height, source, max_removals):
+    """
+    (bytearray, int, int, int, int) -> array of ints
 
-def distance(pos1, pos2):
+    Breadth-first search from source over every state (cell id, barriers removed) of a flattened maze
+    The field is laid out as max_removals+1 layers of len(cells) entries
+    After the search, layer r holds the number of steps to each cell removing at most r barriers, or UNREACHED
     """
-    (tuple of ints, tuple of ints) -> int
 
-    Returns the 1D distance between two points
+    num_cells = len(cells)
+    field = array("i", [UNREACHED]) * (num_cells*(max_removals + 1))
+
+    removed = cells[source]
+    if removed <= max_removals:
+        field[removed*num_cells + source] = 0
+        frontier = [removed*num_cells + source]
+    else:
+        frontier = []
+
+    last_column = width - 1
+    steps = 0
+    while frontier:
+        steps += 1
+        next_frontier = []
+        for state in frontier:
+            removed, cell = divmod(state, num_cells)
+            x = cell % width
+            neighbours = []
+            if x < last_column:
+                neighbours.append(cell+1)
+            if x > 0:
+                neighbours.append(cell-1)
+            if cell + width < num_cells:
+                neighbours.append(cell+width)
+            if cell >= width:
+                neighbours.append(cell-width)
+
+            for neighbour in neighbours:
+                new_removed = removed + cells[neighbour]
+                if new_removed <= max_removals:
+                    new_state = new_removed*num_cells + neighbour
+                    if field[new_state] == UNREACHED:
+                        field[new_state] = steps
+                        next_frontier.append(new_state)
+
+        frontier = next_frontier
+
+    #Fold each layer into the next so that layer r covers every count of removals up to r
+    for removed in range(1, max_removals + 1):
+        offset = removed*num_cells
+        for cell in range(num_cells):
+            if field[offset - num_cells + cell] < field[offset + cell]:
+                field[offset + cell] = field[offset - num_cells + cell]
+
+    return field
+
+def write_packed_maze(maze, path, bits=8):
+    """
+    (list of lists, str, int) -> NoneType
+
+    Write a maze in the format read by PackedMaze
+    """
+
+    with open(path, "wb") as maze_file:
+        for row in maze:
+            if bits == 8:
+                maze_file.write(bytes(row))
+            else:
+                packed = bytearray((len(row) + 7)//8)
+                for x, value in enumerate(row):
+                    if value:
+                        packed[x//8] |= 0x80 >> (x % 8)
+                maze_file.write(packed)
+
+def tile_search(cells, tile_width, tile_height, seeds, max_removals):
+    """
+    (bytearray, int, int, list of tuples, int) -> array of ints
+
+    Breadth-first search over the (cell, barriers removed) states of one tile from seeds of (steps, state)
+    States are numbered removed*len(cells) + cell id within the tile
+    Seeds are added to the search when it reaches their number of steps, so the result holds true distances within the tile
+    """
+
+    num_cells = len(cells)
+    field = array("i", [UNREACHED]) * (num_cells*(max_removals + 1))
+    seeds.sort()
+
+    last_column = tile_width - 1
+    next_seed = 0
+    frontier = []
+    steps = 0
+    while frontier or next_seed < len(seeds):
+        if not frontier:
+            steps = seeds[next_seed][0]
+        while next_seed < len(seeds) and seeds[next_seed][0] == steps:
+            state = seeds[next_seed][1]
+            if field[state] > steps:
+                field[state] = steps
+                frontier.append(state)
+            next_seed += 1
+
+        steps += 1
+        next_frontier = []
+        for state in frontier:
+            if field[state] != steps - 1:
+                continue
+            removed, cell = divmod(state, num_cells)
+            x = cell % tile_width
+            neighbours = []
+            if x < last_column:
+                neighbours.append(cell+1)
+            if x > 0:
+                neighbours.append(cell-1)
+            if cell + tile_width < num_cells:
+                neighbours.append(cell+tile_width)
+            if cell >= tile_width:
+                neighbours.append(cell-tile_width)
+
+            for neighbour in neighbours:
+                new_removed = removed + cells[neighbour]
+                if new_removed <= max_removals:
+                    new_state = new_removed*num_cells + neighbour
+                    if field[new_state] > steps:
+                        field[new_state] = steps
+                        next_frontier.append(new_state)
+
+        frontier = next_frontier
+
+    return field
+
+def tiled_search(maze, max_removals=1, tile_size=256, scratch_dir=None):
+    """
+    (PackedMaze, int, int, str) -> int
+
+    Produce the shortest path length from the top left to the bottom right of a packed maze, one tile at a time
+    Only one tile's cells and distances are held at once. The best known distances to the border cells of each tile
+    are kept in a TileBorders scratch file in scratch_dir, or the default temporary directory
+    A tile is searched from its border distances and the distances it finds on its own border are passed to its neighbours
+    Tiles are processed in order of their smallest improved border distance and may be revisited when a border improves
+    Expect each tile to be read about 4-5 times on random mazes, so this is several times slower than solution()
+    The search stops once no waiting tile can improve on the best path to the end
+    """
+
+    tiles_across = (maze.width + tile_size - 1)//tile_size
+    tiles_down = (maze.height + tile_size - 1)//tile_size
+    num_layers = max_removals + 1
+
+    start_tile = (0, 0)
+    end_tile = ((maze.width - 1)//tile_size, (maze.height - 1)//tile_size)
+    best = float("inf")
+
+    with TileBorders(tiles_across, tiles_down, tile_size, num_layers, scratch_dir) as borders:
+        values = borders.values
+        heap = [(0, start_tile)]
+        waiting = {start_tile: 0}
+        while heap:
+            key, tile = heappop(heap)
+            if waiting.get(tile) != key:
+                continue
+            waiting.pop(tile)
+            if key + 1 >= best:
+                break
+
+            tile_x, tile_y = tile
+            left = tile_x*tile_size
+            top = tile_y*tile_size
+            tile_width = min(tile_size, maze.width - left)
+            tile_height = min(tile_size, maze.height - top)
+            cells = maze.read_tile(left, top, tile_width, tile_height)
+            num_cells = len(cells)
+
+            #Collect the seeds entering this tile, paying for the border cell if it is a barrier
+            seeds = []
+            if tile == start_tile and cells[0] <= max_removals:
+                seeds.append((0, cells[0]*num_cells))
+            sides = [(0, tile_width, [offset for offset in range(tile_width)]),
+                     (1, tile_width, [(tile_height - 1)*tile_width + offset for offset in range(tile_width)]),
+                     (2, tile_height, [offset*tile_width for offset in range(tile_height)]),
+                     (3, tile_height, [offset*tile_width + tile_width - 1 for offset in range(tile_height)])]
+            for side, length, border_cells in sides:
+                base = borders.incoming(tile_x, tile_y, side)
+                if base is None:
+                    continue
+                for offset, cell in enumerate(border_cells):
+                    for removed in range(num_layers):
+                        steps = values[base + offset*num_layers + removed]
+                        new_removed = removed + cells[cell]
+                        if steps != 0 and new_removed <= max_removals:
+                            seeds.append((steps, new_removed*num_cells + cell))
+
+            field = tile_search(cells, tile_width, tile_height, seeds, max_removals)
+
+            if tile == end_tile:
+                for removed in range(num_layers):
+                    steps = field[removed*num_cells + num_cells - 1]
+                    if steps != UNREACHED and steps + 1 < best:
+                        best = steps + 1
+
+            #Pass the distances on this tile's border to the facing border of each neighbouring tile
+            for side, length, border_cells in sides:
+                base = borders.outgoing(tile_x, tile_y, side)
+                if base is None:
+                    continue
+                neighbour_tile = [(tile_x, tile_y - 1), (tile_x, tile_y + 1), (tile_x - 1, tile_y), (tile_x + 1, tile_y)][side]
+
+                improved = UNREACHED
+                for offset, cell in enumerate(border_cells):
+                    for removed in range(num_layers):
+                        steps = field[removed*num_cells + cell]
+                        index = base + offset*num_layers + removed
+                        if steps != UNREACHED and (values[index] == 0 or steps + 1 < values[index]):
+                            values[index] = steps + 1
+                            if steps + 1 < improved:
+                                improved = steps + 1
+
+                if improved != UNREACHED and improved < waiting.get(neighbour_tile, UNREACHED):
+                    waiting[neighbour_tile] = improved
+                    heappush(heap, (improved, neighbour_tile))
+
+    return best
+
+def solve_packed_maze(path, width, height, bits=8, max_removals=1, tile_size=256, scratch_dir=None):
+    """
+    (str, int, int, int, int, int, str) -> int
+
+    Memory-map a packed maze file and solve it tile by tile, as solution() does for a list of lists
+    """
+
+    with PackedMaze(path, width, height, bits) as maze:
+        return tiled_search(maze, max_removals, tile_size, scratch_dir)
+
+def walls_removed_search(maze, max_removals=1):
+    """
+    (list of lists, int) -> int
+
+    Produce the shortest path length from the top left to the bottom right where at most max_removals barriers can be removed
+    Unlike solution_by_barrier() the maze is searched once, with the removed barriers tracked as part of each state
+    This is O(cells*max_removals) rather than O(barriers*cells)
     """
 
-    x1, y1 = pos1
-    x2, y2 = pos2
-    return abs(x1-x2)+abs(y1-y2)
+    height = len(maze)
+    width = len(maze[0])
+    return removals_search(flatten_maze(maze), width, height, 0, width*height - 1, max_removals)
 
-def solution(maze):
+def solution(maze, max_removals=1):
+    """
+    (list of lists, int) -> int
+
+    Produce the shortest path length from the top left to the bottom right where at most one barrier can be removed
+    More barriers can be removed by raising max_removals
+    """
+
+    return walls_removed_search(maze, max_removals)
+
+def solution_by_barrier(maze):
     """
     (list of lists) -> int
 
     Produce the shortest path length from the top left to the bottom right where at most one barrier can be removed
+    The graph is generated and contracted once, then each relevant barrier is opened in turn with set_cell()
+    Only the corridors touching that barrier are expanded and re-contracted before solving
+    Kept as a reference implementation for walls_removed_search()
     """
 
-    #Instantiate the class and produce of list of barriers that we will remove one at a time
-    path = graph(maze)
+    #Instantiate the class on a copy of the maze, as barriers are toggled in place, and produce the list of barriers to remove
+    path = graph([row[:] for row in maze])
     path.generate_barriers()
     path.remove_irrelevant_barriers()
+    barriers = sorted(path.barriers)
 
-    solutions = []
-
-    #If there is a barrier, add one barrier at a time as a node and solve for the shortest path
-    if path.barriers:
-        for barrier in path.barriers:
-            path.generate_nodes()
-            path.add_node(barrier)
-            path.generate_graph_dict()
+    #Build the contracted graph once and keep it as the index for every barrier
+    path.generate_nodes()
+    path.generate_graph_dict()
+    path.contract()
 
-            #Run the simplify() algorithm as many times as necessary such that the graph stops changing
-            repeat = True
-            while repeat:
-                repeat = path.simplify()
+    solutions = []
 
-            #Find the shortest path. If path is the minimum  possible, return it
+    #If there is a barrier, open one barrier at a time and solve for the shortest path
+    if barriers:
+        for barrier in barriers:
+            x, y = barrier
+            path.set_cell(x, y, 0)
             solution = path.find_shortest_path()
+            path.set_cell(x, y, 1)
+
+            #If path is the minimum possible, return it
             if solution == path.height + path.width - 1:
                 return solution
             solutions.append(solution)
 
     #If there are no barriers, make no substitutions and find the shortest path as before
     else:
-        path.generate_nodes()
-        path.generate_graph_dict()
-
-        repeat = True
-        while repeat:
-            repeat = path.simplify()
         solutions.append(path.find_shortest_path())
 
     #Loop through the possible shortest paths for different barriers missing to find the shortest overall path
@@ -314,7 +1672,8 @@ def solution(maze):
 
 
 
-maze = [[0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+#Example maze from the challenge, shortest path 39
+SAMPLE_MAZE = [[0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
               [1, 1, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
               [1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
               [1, 1, 1, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
@@ -334,9 +1693,12 @@ maze = [[0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
               [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0]]
-# maze = [[0, 0, 1, 1, 1], [1, 1, 1, 1, 1], [1, 0, 0, 0, 0], [0, 0, 0, 0, 0], [0, 0, 0, 0, 0]]
-# maze = [[0, 0, 0, 0, 0, 0], [0, 0, 1, 0, 0, 0]]
-# maze = [[0, 0, 0, 1], [0, 0, 0, 1], [0, 0, 0, 1], [1, 1, 1, 0]]
-# maze = [[0, 1, 1, 0], [0, 0, 0, 1], [1, 1, 0, 0], [1, 1, 1, 0]]
 
-print(solution(maze))
\ No newline at end of file
+if __name__ == "__main__":
+    maze = SAMPLE_MAZE
+    # maze = [[0, 0, 1, 1, 1], [1, 1, 1, 1, 1], [1, 0, 0, 0, 0], [0, 0, 0, 0, 0], [0, 0, 0, 0, 0]]
+    # maze = [[0, 0, 0, 0, 0, 0], [0, 0, 1, 0, 0, 0]]
+    # maze = [[0, 0, 0, 1], [0, 0, 0, 1], [0, 0, 0, 1], [1, 1, 1, 0]]
+    # maze = [[0, 1, 1, 0], [0, 0, 0, 1], [1, 1, 0, 0], [1, 1, 1, 0]]
+
+    print(solution(maze))
\ No newline at end of file
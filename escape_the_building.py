@@ -8,7 +8,25 @@
 #Negative times are possible as passing through certain corridors increases your time limit
 #Return a list containing the most amount of rooms that can be visited
 
-from itertools import permutations as perm
+from bisect import bisect_right
+from itertools import accumulate
+from itertools import chain
+
+from a_star import a_star
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+#Rooms from which floyd_warshall() switches to the cache-blocked engine
+BLOCKED_THRESHOLD = 2000
+
+#Fraction of possible corridors below which all_pairs_shortest_paths() uses Johnson's algorithm
+#The vectorised Floyd-Warshall is so much faster that only the sparsest prisons are worth it with NumPy
+#See benchmark_escape_the_building.py for the crossover
+JOHNSON_DENSITY = 0.2
+JOHNSON_DENSITY_NUMPY = 0.005
 
 def floyd_warshall(times):
     """
@@ -18,16 +36,41 @@ def floyd_warshall(times):
     Look for a shorter path to connect two nodes e.g.
     1->2 may be replaced with 1->3->2 if the weight of the new path is lower
     Updating the weights allows us to move to the next node via the most efficient path
+    The middle node must be the outermost loop so every path through earlier middle nodes is already known
     This algorithm also finds any negative cycles whereby we could gain infite time and rescue all the bunnies
+    With NumPy available, each middle node relaxes the whole matrix at once, in blocks for large prisons
+    Integer times come back as ints, and prisons NumPy cannot hold exactly use the loops below
+    times is updated in place and returned, or False is returned if a negative cycle is found
     """
 
-    #For each edge, loop through all possible new edges and update the weights
     num_nodes = len(times)
-    for start_node in range(num_nodes):
-        for middle_node in range(num_nodes):
+    converted = exact_array(times) if np is not None and num_nodes > 0 else None
+    if converted is not None:
+        dist, integral = converted
+        if num_nodes >= BLOCKED_THRESHOLD:
+            dist = floyd_warshall_blocked(dist)
+        else:
+            dist = floyd_warshall_vectorized(dist)
+        if dist is False:
+            return False
+        if integral:
+            #Go through int64 and object arrays so the finite times come back as Python ints
+            finite = np.isfinite(dist)
+            dist = np.where(finite, dist, 0).astype(np.int64).astype(object)
+            dist[~finite] = float("inf")
+        for row, values in zip(times, dist.tolist()):
+            row[:] = values
+        return times
+
+    #For each middle node, loop through all pairs of nodes and update the weights
+    for middle_node in range(num_nodes):
+        middle_row = times[middle_node]
+        for start_node in range(num_nodes):
+            start_row = times[start_node]
+            start_to_middle = start_row[middle_node]
             for end_node in range(num_nodes):
-                if times[start_node][end_node] > times[start_node][middle_node] + times[middle_node][end_node]:
-                    times[start_node][end_node] = times[start_node][middle_node] + times[middle_node][end_node]
+                if start_row[end_node] > start_to_middle + middle_row[end_node]:
+                    start_row[end_node] = start_to_middle + middle_row[end_node]
 
     #If a negative cycle is found, we can return to the same point in negative time
     #We show a negative cycle has been found by returning False
@@ -37,6 +80,491 @@ def floyd_warshall(times):
 
     return times
 
+def exact_array(times):
+    """
+    (list of lists of ints) -> (numpy array, bool) or NoneType
+
+    Convert times to a NumPy array in which every shortest path time is exact
+    Integer times stay int64, or become float64 when inf is present, as long as paths of up to n corridors cannot overflow
+    Return the array and whether it is a float array standing in for ints and inf
+    Return None if NumPy would need an object array or could lose precision
+    """
+
+    dist = np.array(times)
+    if dist.dtype.kind not in "if":
+        return None
+
+    finite = dist[np.isfinite(dist)] if dist.dtype.kind == "f" else dist
+    largest = int(np.abs(finite).max()) if finite.size else 0
+    if dist.dtype.kind == "i":
+        bound = 2**62
+        integral = False
+    elif set(map(type, chain.from_iterable(times))) <= {int, float} and all(time == float("inf") for row in times for time in row if type(time) is float):
+        bound = 2**53
+        integral = True
+    else:
+        return (dist, False)
+    return (dist, integral) if largest*len(dist) < bound else None
+
+def floyd_warshall_vectorized(dist):
+    """
+    (numpy array) -> numpy array
+
+    Floyd-Warshall on a square NumPy array, relaxing every pair through one middle node per step
+    The step is a whole-matrix minimum with the broadcast sum of the middle column and middle row
+    Stop as soon as a diagonal entry turns negative, before repeated negative cycles can overflow integer times
+    Return the updated array or False if there is a negative cycle
+    """
+
+    step = np.empty_like(dist)
+    diagonal = np.einsum("ii->i", dist)
+    for middle_node in range(len(dist)):
+        np.add(dist[:, middle_node, None], dist[middle_node], out=step)
+        np.minimum(dist, step, out=dist)
+        if diagonal.min() < 0:
+            return False
+    return dist
+
+def floyd_warshall_blocked(dist, block_size=256):
+    """
+    (numpy array, int) -> numpy array or bool
+
+    Cache-blocked Floyd-Warshall on a square NumPy array for prisons of thousands of rooms
+    For each block of middle nodes, first close the diagonal tile, then the row and column bands through it
+    Every other tile is then relaxed through the block using only the finished bands, so one tile stays in cache at a time
+    Tiles whose column or row band is entirely infinite cannot improve and are skipped
+    Return the updated array or False if there is a negative cycle
+    """
+
+    num_nodes = len(dist)
+    diagonal = np.einsum("ii->i", dist)
+    step = np.empty((block_size, max(block_size, num_nodes)), dtype=dist.dtype)
+    for block_start in range(0, num_nodes, block_size):
+        block_end = min(block_start + block_size, num_nodes)
+        block = slice(block_start, block_end)
+
+        #Diagonal tile, then the row and column bands, each through the middle nodes of this block in order
+        tile = dist[block, block]
+        for middle_node in range(block_start, block_end):
+            local = middle_node - block_start
+            np.minimum(tile, np.add(tile[:, local, None], tile[local], out=step[:len(tile), :len(tile)]), out=tile)
+        if diagonal[block].min() < 0:
+            return False
+
+        row_band = dist[block]
+        column_band = dist[:, block]
+        for middle_node in range(block_start, block_end):
+            local = middle_node - block_start
+            np.minimum(row_band, np.add(row_band[:, middle_node, None], dist[middle_node], out=step[:len(tile), :num_nodes]), out=row_band)
+            np.minimum(column_band, column_band[:, local, None] + tile[local], out=column_band)
+
+        #Every remaining tile through the finished bands
+        for row_start in range(0, num_nodes, block_size):
+            if row_start == block_start:
+                continue
+            rows = slice(row_start, min(row_start + block_size, num_nodes))
+            column_panel = dist[rows, block]
+            if np.isinf(column_panel).all():
+                continue
+
+            for column_start in range(0, num_nodes, block_size):
+                if column_start == block_start:
+                    continue
+                columns = slice(column_start, min(column_start + block_size, num_nodes))
+                row_panel = dist[block, columns]
+                if np.isinf(row_panel).all():
+                    continue
+
+                tile = dist[rows, columns]
+                tile_step = step[:tile.shape[0], :tile.shape[1]]
+                for local in range(block_end - block_start):
+                    np.add(column_panel[:, local, None], row_panel[local], out=tile_step)
+                    np.minimum(tile, tile_step, out=tile)
+
+        if diagonal.min() < 0:
+            return False
+    return dist
+
+def bellman_ford_potentials(times):
+    """
+    (list of lists of ints) -> list of ints or bool
+
+    Bellman-Ford from a virtual room joined to every room by a corridor of time 0
+    Return the shortest time to each room, which makes every corridor time non-negative as time + h[start] - h[end]
+    Return False if there is a negative cycle
+    """
+
+    num_nodes = len(times)
+    infinity = float("inf")
+    for node in range(num_nodes):
+        if times[node][node] < 0:
+            return False
+    corridors = [(start, end, time) for start in range(num_nodes) for end, time in enumerate(times[start]) if start != end and time != infinity]
+
+    potentials = [0]*num_nodes
+    for iteration in range(num_nodes + 1):
+        changed = False
+        for start, end, time in corridors:
+            if potentials[start] + time < potentials[end]:
+                potentials[end] = potentials[start] + time
+                changed = True
+        if not changed:
+            return potentials
+
+    #Still improving after every room could have been used, so a cycle keeps lowering the times
+    return False
+
+def johnson(times):
+    """
+    (list of lists of ints) -> list of lists of ints
+
+    Johnson's algorithm for sparse prisons where most corridors are missing (infinite)
+    The corridors are reweighted with Bellman-Ford potentials so they are non-negative
+    Dijkstra's algorithm is then run from every room, in O(n E log n) rather than O(n^3)
+    As in floyd_warshall(), the diagonal holds the shortest cycle through each room, or its own corridor time if lower
+    The potentials cancel around a cycle, so it is the reweighted time to a room plus its reweighted corridor back
+    times is updated in place and returned, or False is returned if a negative cycle is found, as in floyd_warshall()
+    """
+
+    potentials = bellman_ford_potentials(times)
+    if potentials is False:
+        return False
+
+    num_nodes = len(times)
+    infinity = float("inf")
+    graph_dict = {}
+    incoming = {node: [] for node in range(num_nodes)}
+    for start in range(num_nodes):
+        graph_dict[start] = {end: time + potentials[start] - potentials[end] for end, time in enumerate(times[start]) if end != start and time != infinity}
+        for end, time in graph_dict[start].items():
+            incoming[end].append((start, time))
+
+    for start in range(num_nodes):
+        reached = a_star(graph_dict, start)
+        row = times[start]
+        cycle = min((reached[node] + time for node, time in incoming[start] if node in reached), default=infinity)
+        for end in range(num_nodes):
+            if end == start:
+                row[end] = min(row[end], cycle)
+            elif end in reached:
+                row[end] = reached[end] - potentials[start] + potentials[end]
+            else:
+                row[end] = infinity
+    return times
+
+def all_pairs_shortest_paths(times):
+    """
+    (list of lists of ints) -> list of lists of ints
+
+    Shortest times between every pair of rooms, choosing the engine by the fraction of corridors present
+    Sparse prisons use johnson() and dense ones floyd_warshall()
+    times is updated in place and returned, or False is returned if a negative cycle is found
+    """
+
+    num_nodes = len(times)
+    if num_nodes < 2:
+        return floyd_warshall(times)
+
+    infinity = float("inf")
+    num_corridors = sum(1 for start in range(num_nodes) for end, time in enumerate(times[start]) if start != end and time != infinity)
+    density = JOHNSON_DENSITY if np is None else JOHNSON_DENSITY_NUMPY
+    if num_corridors < density*num_nodes*(num_nodes - 1):
+        return johnson(times)
+    return floyd_warshall(times)
+
+def rescue_costs(times):
+    """
+    (list of lists of ints) -> list of ints or numpy array
+
+    Held-Karp dynamic programming over (rescued bunnies, current room) on the shortest path times
+    Bunny i is held in room i+1 and corresponds to bit i of a mask
+    Return the minimum time of a route from the first room to the last which rescues every bunny in each mask
+    With NumPy available, masks are processed a popcount layer at a time and a float array is returned
+    """
+
+    if np is not None:
+        return _rescue_costs_numpy(times)
+
+    num_buns = len(times) - 2
+    exit_room = num_buns + 1
+    infinity = float("inf")
+
+    #route[mask][bun] is the shortest time to rescue the bunnies in mask, finishing with bun
+    route = [[infinity]*num_buns for mask in range(1 << num_buns)]
+    for bun in range(num_buns):
+        route[1 << bun][bun] = times[0][bun+1]
+
+    costs = [infinity]*(1 << num_buns)
+    costs[0] = times[0][exit_room]
+    for mask in range(1, 1 << num_buns):
+        current = route[mask]
+        costs[mask] = min(current[bun] + times[bun+1][exit_room] for bun in range(num_buns))
+        for last_bun in range(num_buns):
+            time = current[last_bun]
+            if time == infinity:
+                continue
+            for bun in range(num_buns):
+                if not mask >> bun & 1:
+                    next_time = time + times[last_bun+1][bun+1]
+                    if next_time < route[mask | 1 << bun][bun]:
+                        route[mask | 1 << bun][bun] = next_time
+    return costs
+
+def _rescue_costs_numpy(times):
+    """
+    (list of lists of ints) -> numpy array
+
+    Vectorised rescue_costs() keeping only the route table of one popcount layer at a time
+    The table is stored bunny-major so each min-plus step works on contiguous rows
+    Single precision is used whenever every route time is exactly representable in it
+    Adding a bunny that is not in a mask gives a distinct new mask, so each layer is filled without collisions
+    """
+
+    num_buns = len(times) - 2
+    exit_room = num_buns + 1
+    largest_time = max(abs(time) for row in times for time in row)
+    dtype = np.float32 if largest_time*(num_buns+1) < 2**24 else np.float64
+    times = np.array(times, dtype=dtype)
+    bunny_times = times[1:exit_room, 1:exit_room]
+    exit_times = times[1:exit_room, exit_room]
+
+    #Masks sorted by popcount, and the position of each mask within its layer
+    masks = np.arange(1 << num_buns, dtype=np.int32)
+    popcount = np.zeros(len(masks), dtype=np.int8)
+    for bun in range(num_buns):
+        popcount += ((masks >> bun) & 1).astype(np.int8)
+    order = np.argsort(popcount, kind="stable").astype(np.int32)
+    layer_starts = np.concatenate(([0], np.cumsum(np.bincount(popcount, minlength=num_buns+1))))
+    rank = np.empty(len(masks), dtype=np.int32)
+    rank[order] = masks - layer_starts[popcount[order]]
+
+    #route[bun, i] is the shortest time to rescue the bunnies in the i-th mask of the layer, finishing with bun
+    costs = np.full(len(masks), np.inf)
+    costs[0] = times[0, exit_room]
+    route = np.full((num_buns, num_buns), np.inf, dtype=dtype)
+    route[np.arange(num_buns), np.arange(num_buns)] = times[0, 1:exit_room]
+    for layer in range(1, num_buns+1):
+        layer_masks = order[layer_starts[layer]:layer_starts[layer+1]]
+        costs[layer_masks] = (route + exit_times[:, None]).min(axis=0)
+        if layer == num_buns:
+            break
+
+        next_route = np.full((num_buns, layer_starts[layer+2] - layer_starts[layer+1]), np.inf, dtype=dtype)
+        extended = np.empty(len(layer_masks), dtype=dtype)
+        step = np.empty(len(layer_masks), dtype=dtype)
+        for bun in range(num_buns):
+            #Min-plus product of the route table with the times to reach bun
+            np.add(route[0], bunny_times[0, bun], out=extended)
+            for last_bun in range(1, num_buns):
+                np.add(route[last_bun], bunny_times[last_bun, bun], out=step)
+                np.minimum(extended, step, out=extended)
+
+            without = np.flatnonzero((layer_masks >> bun) & 1 == 0)
+            next_route[bun, rank[layer_masks[without] | (1 << bun)]] = extended[without]
+        route = next_route
+    return costs
+
+def choose_rescue(costs, time_limit):
+    """
+    (list of ints or numpy array, int) -> list of ints
+
+    Return the largest set of bunnies whose rescue cost is within the time limit
+    Ties are broken by the lexicographically smallest sorted list of bunnies
+    Among masks of equal popcount that is the one with the largest bit-reversed value
+    """
+
+    num_buns = len(costs).bit_length() - 1
+    if np is not None:
+        feasible = np.flatnonzero(np.asarray(costs) <= time_limit).astype(np.int32)
+        if len(feasible) == 0:
+            return []
+        popcount = np.zeros(len(feasible), dtype=np.int8)
+        for bun in range(num_buns):
+            popcount += ((feasible >> bun) & 1).astype(np.int8)
+        largest = feasible[popcount == popcount.max()]
+        keys = np.zeros(len(largest), dtype=np.int32)
+        for bun in range(num_buns):
+            keys |= ((largest >> bun) & 1) << (num_buns - 1 - bun)
+        best = int(largest[np.argmax(keys)])
+    else:
+        feasible = [mask for mask in range(len(costs)) if costs[mask] <= time_limit]
+        if not feasible:
+            return []
+        best = min(feasible, key=lambda mask: (-bin(mask).count("1"), [bun for bun in range(num_buns) if mask >> bun & 1]))
+
+    return [bun for bun in range(num_buns) if best >> bun & 1]
+
+def update_shortest_paths(dist, times, start, end, time):
+    """
+    (list of lists of ints, list of lists of ints, int, int, int) -> list of lists of ints
+
+    Change the corridor time from start to end in times and repair the shortest paths dist found by floyd_warshall()
+    A decrease can only help paths that use the corridor, so every pair is relaxed through it in O(n^2)
+    It creates a negative cycle exactly when the corridor plus the shortest path back is negative
+    An increase can only hurt pairs whose shortest path was tight through the corridor
+    Those pairs are reset to their corridor times and Floyd-Warshall is rerun over the affected rows alone in O(rows n^2)
+    dist is updated in place and returned, or False is returned if a negative cycle is created
+    """
+
+    num_nodes = len(dist)
+    old_time = times[start][end]
+    times[start][end] = time
+
+    #The diagonal of dist holds the shortest cycle through each room, so paths starting at start or ending at end
+    #use 0 for the empty path instead
+    end_row = list(dist[end])
+    end_row[end] = 0
+
+    if time < old_time:
+        if time + end_row[start] < 0:
+            return False
+
+        for row_node, row in enumerate(dist):
+            to_end = (0 if row_node == start else row[start]) + time
+            if to_end >= row[end]:
+                continue
+            for node in range(num_nodes):
+                if row[node] > to_end + end_row[node]:
+                    row[node] = to_end + end_row[node]
+        return dist
+
+    #An increase changes nothing unless some shortest path used the corridor
+    if time == old_time or old_time > dist[start][end]:
+        return dist
+
+    tight = {}
+    for row_node, row in enumerate(dist):
+        to_end = (0 if row_node == start else row[start]) + old_time
+        if to_end == float("inf") or to_end != row[end]:
+            continue
+        nodes = [node for node in range(num_nodes) if to_end + end_row[node] == row[node]]
+        if nodes:
+            tight[row_node] = nodes
+
+    for row_node, nodes in tight.items():
+        row = dist[row_node]
+        for node in nodes:
+            row[node] = times[row_node][node]
+
+    for middle_node in range(num_nodes):
+        middle_row = dist[middle_node]
+        for row_node in tight:
+            row = dist[row_node]
+            to_middle = row[middle_node]
+            if to_middle == float("inf"):
+                continue
+            for node in range(num_nodes):
+                if row[node] > to_middle + middle_row[node]:
+                    row[node] = to_middle + middle_row[node]
+    return dist
+
+class EscapePlanner:
+    def __init__(self, times):
+        """
+        (EscapePlanner, list of lists of ints) -> NoneType
+
+        Precompute the rescue cost of every subset of bunnies for one prison so many time limits can be answered
+        Masks are sorted by cost and each position keeps the best mask among all masks up to it
+        The best mask is the largest, then the lexicographically smallest, so it has the largest popcount*2^n + reversed bits key
+        The times matrix is not modified
+        """
+
+        self.num_buns = len(times) - 2
+        self.corridors = [list(row) for row in times]
+        self.times = all_pairs_shortest_paths([list(row) for row in times])
+        self.costs = None
+        self.sorted_costs = None
+        self.best_masks = None
+        if self.times:
+            self.index_costs(rescue_costs(self.times))
+
+    def index_costs(self, costs):
+        """
+        (EscapePlanner, list of ints or numpy array) -> NoneType
+
+        Sort the subset costs and record the best mask affordable at each sorted position
+        """
+
+        num_buns = self.num_buns
+        self.costs = costs
+        if np is not None:
+            masks = np.arange(len(costs), dtype=np.int64)
+            keys = np.zeros(len(costs), dtype=np.int64)
+            for bun in range(num_buns):
+                bits = (masks >> bun) & 1
+                keys += (bits << num_buns) | (bits << (num_buns - 1 - bun))
+
+            order = np.argsort(costs, kind="stable")
+            best_keys = np.maximum.accumulate(keys[order])
+            self.sorted_costs = np.asarray(costs)[order]
+
+            #Recover the mask behind each running maximum key
+            reversed_bits = best_keys & ((1 << num_buns) - 1)
+            best_masks = np.zeros(len(costs), dtype=np.int64)
+            for bun in range(num_buns):
+                best_masks |= ((reversed_bits >> (num_buns - 1 - bun)) & 1) << bun
+            self.best_masks = best_masks
+        else:
+            def key(mask):
+                reversed_bits = sum(1 << (num_buns - 1 - bun) for bun in range(num_buns) if mask >> bun & 1)
+                return (bin(mask).count("1") << num_buns) | reversed_bits
+
+            order = sorted(range(len(costs)), key=costs.__getitem__)
+            self.sorted_costs = [costs[mask] for mask in order]
+            best_keys = list(accumulate((key(mask) for mask in order), max))
+            self.best_masks = [sum(1 << bun for bun in range(num_buns) if best_key >> (num_buns - 1 - bun) & 1) for best_key in best_keys]
+
+    def update_time(self, start, end, time):
+        """
+        (EscapePlanner, int, int, int) -> NoneType
+
+        Change the time of the corridor from start to end
+        The shortest paths are repaired with update_shortest_paths() before the subset costs are recomputed
+        A prison with a negative cycle is rebuilt in full since a longer corridor may remove the cycle
+        """
+
+        if self.times:
+            self.times = update_shortest_paths(self.times, self.corridors, start, end, time)
+        else:
+            self.corridors[start][end] = time
+            self.times = all_pairs_shortest_paths([list(row) for row in self.corridors])
+
+        if self.times:
+            self.index_costs(rescue_costs(self.times))
+
+    def best_rescue(self, time_limit):
+        """
+        (EscapePlanner, int) -> list of ints
+
+        Return the same bunnies as solution(times, time_limit) with one binary search
+        """
+
+        if not self.times:
+            return [bun for bun in range(self.num_buns)]
+
+        position = bisect_right(self.sorted_costs, time_limit)
+        if position == 0:
+            return []
+        best = int(self.best_masks[position - 1])
+        return [bun for bun in range(self.num_buns) if best >> bun & 1]
+
+    def best_rescues(self, time_limits):
+        """
+        (EscapePlanner, list of ints) -> list of lists of ints
+
+        Answer a batch of time limits, searching the sorted costs for all of them at once when NumPy is available
+        """
+
+        if not self.times or np is None:
+            return [self.best_rescue(time_limit) for time_limit in time_limits]
+
+        positions = np.searchsorted(self.sorted_costs, np.asarray(time_limits, dtype=float), side="right")
+        rescues = []
+        for position in positions.tolist():
+            best = int(self.best_masks[position - 1]) if position > 0 else 0
+            rescues.append([bun for bun in range(self.num_buns) if best >> bun & 1])
+        return rescues
+
 def solution(times, time_limit):
     """
     (list of lists of ints, int) -> list of ints
@@ -44,38 +572,17 @@ def solution(times, time_limit):
     Find the number of bunnies that can be saved
     Run the Floyd-Warshall algorithm
     If a negative cycle is found, all bunnies can be saved
-    Permute through the bunny cells to find possible paths through the prison
-    Compute the weight of each path
-    If the total time taken to rescue the bunnies is less than the allowed time, return the list of bunnies
+    Otherwise find the minimum time to rescue every subset of bunnies with a Held-Karp bitmask DP in O(2^n n^2)
+    Return the largest subset that can be rescued within the time limit, the lexicographically smallest if tied
     """
 
     #Run Floyd-Warshall to search for a negative cycle. If found, all bunnies can escape
     num_buns = len(times) - 2
-    times = floyd_warshall(times)
+    times = all_pairs_shortest_paths(times)
     if not times:
         return [bun for bun in range(num_buns)]
 
-    #Consider all possible orders that we can collect the bunnies
-    for path_length in reversed(range(1, num_buns+1)):
-        for collection_order in perm(range(1, num_buns+1), path_length):
-
-            #Generate a list of the edges that will need to be taken to attain the bunnies
-            path = [bun for bun in collection_order]
-            path.insert(0, 0)
-            path.append(num_buns+1)
-            edges = list(zip(path, path[1:]))
-
-            #Sum the weights of these edges
-            total_time = 0
-            for start, end in edges:
-                total_time += times[start][end]
-
-            #If we can complete our rescue in the time limit, return the sorted numbers of the saved bunnies
-            if total_time <= time_limit:
-                return sorted([bun_room-1 for bun_room in collection_order])
-
-    #If no bunnies could be saved, return an empty list
-    return []
+    return choose_rescue(rescue_costs(times), time_limit)
 
 
 if __name__ == "__main__":
@@ -9,171 +9,588 @@
 #But we can reach the second and third rooms with capacity 1 and 3
 #Given a list of entrances and a list of exits, determine the maximum number of bunnies that can reach the exits
 
-from collections import defaultdict
-from queue import Queue
-from queue import LifoQueue
-
-def unweighted_graph(path):
-    """
-    (list of lists of ints) -> dict of sets
+from array import array
+from collections import deque
+
+#Binary edge files hold signed 64-bit ints: the number of nodes, the number of edges,
+#then the tails, heads and capacities of the edges as three arrays
+EDGE_FILE_TYPECODE = "q"
+
+class ResidualGraph:
+    def __init__(self, num_nodes=0):
+        """
+        (ResidualGraph, int) -> NoneType
+
+        Residual graph stored as parallel edge arrays and one adjacency list of edge ids per node
+        Every edge e is paired with its reverse edge e^1, which starts with no capacity
+        Pushing flow along e moves capacity from e to e^1, so the flow on e is the capacity of e^1
+        """
+
+        self.num_nodes = num_nodes
+        self.adjacency = [[] for node in range(num_nodes)]
+        self.head = []
+        self.capacity = []
+        self.original = []
+        self.edge_index = {}
+        self.level = None
+
+    @classmethod
+    def from_matrix(cls, path):
+        """
+        (type, list of lists of ints) -> ResidualGraph
+
+        Build the residual graph of a dense capacity matrix, where path[i][j] is the capacity from room i to room j
+        """
+
+        network = cls(len(path))
+        for start_room in range(len(path)):
+            for end_room in range(len(path[start_room])):
+                capacity = path[start_room][end_room]
+                if capacity != 0 and start_room != end_room:
+                    network.add_edge(start_room, end_room, capacity)
+        return network
+
+    @classmethod
+    def from_edges(cls, num_nodes, tails, heads, capacities):
+        """
+        (type, int, sequence of ints, sequence of ints, sequence of ints) -> ResidualGraph
+
+        Build the residual graph of an edge list given as three parallel sequences
+        Lists, array buffers and memoryviews are all accepted so the dense matrix is never built
+        Zero capacities and self-loops are skipped and parallel edges are merged as in add_edge()
+        """
+
+        if not len(tails) == len(heads) == len(capacities):
+            raise ValueError("tails, heads and capacities must have the same length")
+
+        network = cls(num_nodes)
+        adjacency = network.adjacency
+        head = network.head
+        capacity = network.capacity
+        original = network.original
+        edge_index = network.edge_index
+
+        for start, end, edge_capacity in zip(tails, heads, capacities):
+            if edge_capacity == 0 or start == end:
+                continue
+            if not (0 <= start < num_nodes and 0 <= end < num_nodes):
+                raise ValueError("edge (" + str(start) + ", " + str(end) + ") is out of range")
 
-    Generate an unweighted graph from the path array
-    Useful in computing the level graph
-    If path is non-zero add index of end_room as val of dict with idx start_room
-    """
+            edge = edge_index.get((start, end))
+            if edge is not None:
+                capacity[edge] += edge_capacity
+                original[edge] += edge_capacity
+                continue
 
-    unweighted_graph = defaultdict(set)
-    for start_room in range(len(path)):
-        for end_room in range(len(path[start_room])):
-            capacity = path[start_room][end_room]
-            if capacity != 0:
-                unweighted_graph[start_room].add(end_room)
+            edge = len(head)
+            edge_index[(start, end)] = edge
+            head += (end, start)
+            capacity += (edge_capacity, 0)
+            original += (edge_capacity, 0)
+            adjacency[start].append(edge)
+            adjacency[end].append(edge ^ 1)
+        return network
+
+    @classmethod
+    def from_csr(cls, indptr, indices, capacities):
+        """
+        (type, sequence of ints, sequence of ints, sequence of ints) -> ResidualGraph
+
+        Build the residual graph of a compressed sparse row matrix
+        The edges leaving node i are indices[indptr[i]:indptr[i+1]] with the matching capacities
+        """
+
+        num_nodes = len(indptr) - 1
+        tails = array(EDGE_FILE_TYPECODE)
+        for node in range(num_nodes):
+            tails.extend([node]*(indptr[node+1] - indptr[node]))
+        return cls.from_edges(num_nodes, tails, indices[indptr[0]:indptr[-1]], capacities[indptr[0]:indptr[-1]])
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        (type, str) -> ResidualGraph
+
+        Build the residual graph of a binary edge file written by write_edge_file()
+        """
+
+        with open(path, "rb") as edge_file:
+            header = array(EDGE_FILE_TYPECODE)
+            header.fromfile(edge_file, 2)
+            num_nodes, num_edges = header
+
+            columns = []
+            for column in range(3):
+                values = array(EDGE_FILE_TYPECODE)
+                values.fromfile(edge_file, num_edges)
+                columns.append(values)
+        return cls.from_edges(num_nodes, *columns)
+
+    def add_node(self):
+        """
+        (ResidualGraph) -> int
+
+        Add a node with no edges and return its id
+        """
+
+        self.adjacency.append([])
+        self.num_nodes += 1
+        return self.num_nodes - 1
+
+    def add_edge(self, start, end, capacity):
+        """
+        (ResidualGraph, int, int, int) -> int
+
+        Add capacity to the edge from start to end, creating it and its reverse edge if necessary
+        Return the id of the edge
+        """
+
+        edge = self.edge_index.get((start, end))
+        if edge is not None:
+            self.capacity[edge] += capacity
+            self.original[edge] += capacity
+            return edge
+
+        edge = len(self.head)
+        self.edge_index[(start, end)] = edge
+        self.head += [end, start]
+        self.capacity += [capacity, 0]
+        self.original += [capacity, 0]
+        self.adjacency[start].append(edge)
+        self.adjacency[end].append(edge ^ 1)
+        return edge
+
+    def add_terminals(self, entrances, exits):
+        """
+        (ResidualGraph, list of ints, list of ints) -> (int, int)
+
+        Add a super source feeding every entrance and a super sink fed by every exit
+        Their edges get more capacity than the whole graph so they never limit the flow
+        Return the ids of the source and sink
+        """
+
+        unlimited = sum(self.original) + 1
+        source = self.add_node()
+        sink = self.add_node()
+        for entrance in entrances:
+            self.add_edge(source, entrance, unlimited)
+        for exit in exits:
+            self.add_edge(exit, sink, unlimited)
+        return (source, sink)
+
+    def generate_level_graph(self, source, threshold=0):
+        """
+        (ResidualGraph, int, int) -> list of ints
+
+        BFS from the source over edges with more than threshold residual capacity
+        Return the level of every node, -1 for nodes that cannot be reached
+        The levels are also kept in self.level: after the last phase they mark the source side of a minimum cut
+        """
+
+        level = [-1]*self.num_nodes
+        level[source] = 0
+        queue = [source]
+        for node in queue:
+            next_level = level[node] + 1
+            for edge in self.adjacency[node]:
+                neighbour = self.head[edge]
+                if level[neighbour] < 0 and self.capacity[edge] > threshold:
+                    level[neighbour] = next_level
+                    queue.append(neighbour)
+
+        self.level = level
+        return level
+
+    def blocking_flow(self, source, sink, level, limit, threshold=0):
+        """
+        (ResidualGraph, int, int, list of ints, int, int) -> int
+
+        Iterative depth-first search for a blocking flow through the level graph, pushing at most limit
+        Only edges to the next level with more than threshold residual capacity are used
+        Each node keeps a current-arc pointer so edges that failed are never tried again in this phase
+        After augmenting, the search backs up to the first edge that became unusable
+        Return the flow pushed
+        """
+
+        adjacency = self.adjacency
+        head = self.head
+        capacity = self.capacity
+        pointer = [0]*self.num_nodes
+
+        total = 0
+        path = []
+        node = source
+        while total < limit:
+            if node == sink:
+                bottleneck = min(limit - total, min(capacity[edge] for edge in path))
+                for edge in path:
+                    capacity[edge] -= bottleneck
+                    capacity[edge ^ 1] += bottleneck
+                total += bottleneck
+
+                for position, edge in enumerate(path):
+                    if capacity[edge] <= threshold:
+                        del path[position:]
+                        break
+                node = head[path[-1]] if path else source
+                continue
 
-    return unweighted_graph
-    
-def generate_level_graph(entrances, exits, path):
-    """
-    (list of ints, list of ints, list of lists of ints) -> list of ints
+            edges = adjacency[node]
+            next_level = level[node] + 1
+            position = pointer[node]
+            while position < len(edges):
+                edge = edges[position]
+                if capacity[edge] > threshold and level[head[edge]] == next_level:
+                    break
+                position += 1
+            pointer[node] = position
+
+            if position < len(edges):
+                path.append(edges[position])
+                node = head[edges[position]]
+            elif node == source:
+                break
+            else:
+                #Dead end: remove the node from this phase and move the previous node past the edge that led here
+                level[node] = -1
+                node = head[path.pop() ^ 1]
+                pointer[node] += 1
+
+        return total
+
+    def dinic(self, source, sink, limit=float("inf")):
+        """
+        (ResidualGraph, int, int, int) -> int
+
+        Dinic's algorithm from the current residual state, pushing at most limit from source to sink
+        Each phase builds a level graph by BFS then pushes a blocking flow through it in O(VE)
+        Return the flow pushed
+        """
+
+        total = 0
+        while total < limit:
+            level = self.generate_level_graph(source)
+            if level[sink] < 0:
+                break
+            total += self.blocking_flow(source, sink, level, limit - total)
+        return total
+
+    def scaling_dinic(self, source, sink, factor=1024):
+        """
+        (ResidualGraph, int, int, int) -> int
+
+        Capacity-scaling Dinic's algorithm from the current residual state
+        Phases only use residual edges of at least delta, starting from the largest power of factor below the biggest capacity
+        delta is divided by factor once no such path remains, finishing with plain Dinic's algorithm at delta = 1
+        This avoids many tiny augmenting paths when capacities span a wide range
+        Every delta costs at least one BFS, so a large factor keeps the number of level graphs close to plain Dinic's
+        The super source and sink edges are ignored when choosing delta since their capacity is effectively unlimited
+        Return the flow pushed
+        """
+
+        head = self.head
+        largest = 0
+        for edge in range(0, len(head), 2):
+            if head[edge] != sink and head[edge ^ 1] != source:
+                largest = max(largest, self.capacity[edge])
+
+        delta = 1
+        while delta*factor <= largest:
+            delta *= factor
+
+        total = 0
+        while delta > 1:
+            while True:
+                level = self.generate_level_graph(source, delta - 1)
+                if level[sink] < 0:
+                    break
+                total += self.blocking_flow(source, sink, level, float("inf"), delta - 1)
+            delta //= factor
+        return total + self.dinic(source, sink)
+
+    def global_relabel(self, source, sink, height):
+        """
+        (ResidualGraph, int, int, list of ints) -> NoneType
+
+        Set every height to the exact residual distance to the sink by a backwards BFS that does not pass through the source
+        Nodes that cannot reach the sink are lifted to num_nodes, out of the way of the first phase
+        """
+
+        num_nodes = self.num_nodes
+        for node in range(num_nodes):
+            height[node] = num_nodes
+        height[sink] = 0
+        queue = [sink]
+        for node in queue:
+            next_height = height[node] + 1
+            if node == source:
+                continue
+            for edge in self.adjacency[node]:
+                neighbour = self.head[edge]
+                if height[neighbour] == num_nodes and self.capacity[edge ^ 1] > 0:
+                    height[neighbour] = next_height
+                    queue.append(neighbour)
+
+    def push_relabel(self, source, sink):
+        """
+        (ResidualGraph, int, int) -> int
+
+        Highest-label push-relabel: the active node with the greatest height is discharged first, FIFO among equal heights
+        Gap heuristic: when no node is left at some height, every node above it is cut off from the sink and lifted to num_nodes
+        Global relabel heuristic: heights are recomputed exactly by BFS after every num_nodes relabels
+        Only the first phase is run, moving as much flow as possible into the sink
+        The residual graph is left holding a preflow, so the excess of cut off nodes is not returned to the source
+        Return the maximum flow
+        """
+
+        num_nodes = self.num_nodes
+        adjacency = self.adjacency
+        head = self.head
+        capacity = self.capacity
+
+        height = [0]*num_nodes
+        excess = [0]*num_nodes
+        pointer = [0]*num_nodes
+
+        #Saturate the source edges
+        for edge in adjacency[source]:
+            pushed = capacity[edge]
+            if pushed > 0:
+                capacity[edge] -= pushed
+                capacity[edge ^ 1] += pushed
+                excess[head[edge]] += pushed
+                excess[source] -= pushed
+
+        def rebuild():
+            #Recompute the heights and gather the active nodes into buckets by height
+            self.global_relabel(source, sink, height)
+            height[source] = num_nodes
+            buckets = [deque() for h in range(num_nodes)]
+            count = [0]*(2*num_nodes + 1)
+            for node in range(num_nodes):
+                count[height[node]] += 1
+                pointer[node] = 0
+                if excess[node] > 0 and node != sink and height[node] < num_nodes:
+                    buckets[height[node]].append(node)
+            return buckets, count
+
+        buckets, count = rebuild()
+        highest = num_nodes - 1
+        relabels = 0
+
+        while highest >= 0:
+            if not buckets[highest]:
+                highest -= 1
+                continue
 
-    From the path, generate the levels of each node
-    BFS determines the corresponding level
-    """
+            node = buckets[highest].popleft()
+            if height[node] != highest or excess[node] <= 0:
+                continue
 
-    #Generate an unweighted graph
-    unweighted = unweighted_graph(path)
-
-    #Track the nodes already visited with a set and the nodes under consideration with a FIFO queue
-    #Initialise the level graph such that unvisited nodes have a value of 0
-    visited = set()
-    q = Queue()
-    level_graph = defaultdict(int)
-
-    #Add the entrance nodes to our queue, set and dict
-    #Entrance nodes have level 1
-    for entrance in entrances:
-        visited.add(entrance)
-        q.put(entrance)
-        level_graph[entrance] += 1
-
-    #Typical BFS construction
-    while not q.empty():
-        node = q.get()
-
-        node_level = level_graph[node]
-
-        #Check neighbours of the current node
-        #Update the level of the neighbours if 0 or if the level of the previous node is less than the current node - 1
-        for neighbour in unweighted[node]:
-            if neighbour not in visited:
-                visited.add(neighbour)
-                q.put(neighbour)
-                neighbour_level = level_graph[neighbour]
-                if neighbour_level == 0 or node_level <  (neighbour_level - 1):
-                    level_graph[neighbour] = node_level + 1
-
-    #If none of the exits are reached then we return 0 otherwise return the level graph
-    exit_levels = [level_graph[exit] for exit in exits]
-    if any(exit_levels):
-        return level_graph
-    else:
-        return 0
-
-def depth_first_search(entrance, exits, path, level):
+            #Discharge: push along admissible edges, relabelling when the current arc runs out
+            edges = adjacency[node]
+            while excess[node] > 0:
+                if pointer[node] == len(edges):
+                    old_height = height[node]
+                    new_height = 2*num_nodes
+                    for edge in edges:
+                        if capacity[edge] > 0 and height[head[edge]] + 1 < new_height:
+                            new_height = height[head[edge]] + 1
+                    count[old_height] -= 1
+                    height[node] = new_height
+                    count[new_height] += 1
+                    pointer[node] = 0
+                    relabels += 1
+
+                    #Gap: nothing is left at old_height, so nodes above it can no longer reach the sink
+                    if count[old_height] == 0 and old_height < num_nodes:
+                        for other in range(num_nodes):
+                            if old_height < height[other] < num_nodes:
+                                count[height[other]] -= 1
+                                height[other] = num_nodes
+                                count[num_nodes] += 1
+                    if height[node] >= num_nodes:
+                        break
+                    continue
+
+                edge = edges[pointer[node]]
+                neighbour = head[edge]
+                if capacity[edge] > 0 and height[node] == height[neighbour] + 1:
+                    pushed = min(excess[node], capacity[edge])
+                    capacity[edge] -= pushed
+                    capacity[edge ^ 1] += pushed
+                    excess[node] -= pushed
+                    if excess[neighbour] == 0 and neighbour != sink and neighbour != source:
+                        buckets[height[neighbour]].append(neighbour)
+                        highest = max(highest, height[neighbour])
+                    excess[neighbour] += pushed
+                else:
+                    pointer[node] += 1
+
+            if relabels >= num_nodes:
+                buckets, count = rebuild()
+                relabels = 0
+                highest = num_nodes - 1
+            elif excess[node] > 0 and height[node] < num_nodes:
+                buckets[height[node]].append(node)
+                highest = max(highest, height[node])
+
+        return excess[sink]
+
+class FlowNetwork:
+    def __init__(self, entrances, exits, network):
+        """
+        (FlowNetwork, list of ints, list of ints, ResidualGraph) -> NoneType
+
+        A building whose residual state is kept between max flow calls
+        Capacities can then be changed and the flow repaired from where it was rather than from zero
+        """
+
+        self.graph = network
+        self.num_rooms = network.num_nodes
+        self.source, self.sink = network.add_terminals(entrances, exits)
+        self.terminal_edges = [network.edge_index[(self.source, entrance)] for entrance in entrances]
+        self.terminal_edges += [network.edge_index[(exit, self.sink)] for exit in exits]
+        self.flow = 0
+
+    @classmethod
+    def from_matrix(cls, entrances, exits, path):
+        """
+        (type, list of ints, list of ints, list of lists of ints) -> FlowNetwork
+
+        Build a flow network from a dense capacity matrix as used by solution()
+        """
+
+        return cls(entrances, exits, ResidualGraph.from_matrix(path))
+
+    def max_flow(self):
+        """
+        (FlowNetwork) -> int
+
+        Augment the current flow with Dinic's algorithm until it is maximal and return it
+        """
+
+        self.flow += self.graph.dinic(self.source, self.sink)
+        return self.flow
+
+    def update_capacity(self, start_room, end_room, capacity):
+        """
+        (FlowNetwork, int, int, int) -> int
+
+        Change the capacity of the corridor from start_room to end_room and return the new max flow
+        If the corridor now carries more than its capacity, the excess is first rerouted from start_room to end_room
+        Whatever cannot be rerouted is sent back to the source and pulled back from the sink, reducing the flow
+        The flow is then augmented again from the residual state
+        """
+
+        graph = self.graph
+        edge = graph.edge_index.get((start_room, end_room))
+        if edge is None:
+            graph.add_edge(start_room, end_room, capacity)
+            self.raise_terminals(capacity)
+            return self.max_flow()
+
+        flow = graph.capacity[edge ^ 1]
+        old_capacity = graph.original[edge]
+        graph.original[edge] = capacity
+
+        if capacity >= flow:
+            graph.capacity[edge] = capacity - flow
+            if capacity > old_capacity:
+                self.raise_terminals(capacity - old_capacity)
+        else:
+            graph.capacity[edge] = 0
+            graph.capacity[edge ^ 1] = capacity
+            excess = flow - capacity
+            excess -= graph.dinic(start_room, end_room, excess)
+            if excess > 0:
+                graph.dinic(start_room, self.source, excess)
+                graph.dinic(self.sink, end_room, excess)
+                self.flow -= excess
+
+        return self.max_flow()
+
+    def raise_terminals(self, capacity):
+        """
+        (FlowNetwork, int) -> NoneType
+
+        Keep the super source and sink edges above the total capacity of the building after it grows
+        """
+
+        for edge in self.terminal_edges:
+            self.graph.capacity[edge] += capacity
+            self.graph.original[edge] += capacity
+
+    def min_cut(self):
+        """
+        (FlowNetwork) -> list of tuples
+
+        Return the corridors (start room, end room) of a minimum cut, whose capacities sum to the max flow
+        The source side is read from the levels of the last Dinic BFS, which failed to reach the sink
+        """
+
+        if self.graph.level is None:
+            self.max_flow()
+
+        level = self.graph.level
+        cut = []
+        for (start_room, end_room), edge in self.graph.edge_index.items():
+            if start_room < self.num_rooms and end_room < self.num_rooms and level[start_room] >= 0 and level[end_room] < 0 and self.graph.original[edge] > 0:
+                cut.append((start_room, end_room))
+        return cut
+
+def write_edge_file(path, num_nodes, tails, heads, capacities):
     """
-    (int, list of ints, list of lists of ints) -> (list of lists of ints, int)
+    (str, int, sequence of ints, sequence of ints, sequence of ints) -> NoneType
 
-    Using our level graph, we look for the blocking flow
-    A typical depth-first search is used
-    The flow is augmented after the sink is reached
-    Return the augmented path (graph) and the bottleneck value
+    Write an edge list to a binary edge file that ResidualGraph.from_file() can read
     """
 
-    #Pre-processing: If level==False then we could not generate a level graph, abort the function
-    if not level:
-        return False
-
-    #To aide our computation, generate an unweighted graph
-    unweighted = unweighted_graph(path)
+    if not len(tails) == len(heads) == len(capacities):
+        raise ValueError("tails, heads and capacities must have the same length")
 
-    #Initialise queue (to track considered nodes) and set (to track visited nodes)
-    q = LifoQueue()
-    visited = set()
+    with open(path, "wb") as edge_file:
+        array(EDGE_FILE_TYPECODE, [num_nodes, len(tails)]).tofile(edge_file)
+        for column in (tails, heads, capacities):
+            array(EDGE_FILE_TYPECODE, column).tofile(edge_file)
 
-    #Add entrance
-    visited.add(entrance)
-    q.put(entrance)
-
-    while not q.empty():
-        #Obtain current node by taking it from the queue and putting it straight back
-        node = q.get()
-        q.put(node)
-
-        neighbours = unweighted[node]
-
-        #If we reach a dead-end, remove last node and try again at previous step
-        if len(neighbours) == 0:
-            q.get()
-            continue
-
-        #Select element from neighbours
-        neighbour = unweighted[node].pop()
-
-        #Consider only neighbours with a greater level as per Dinic's algorithm
-        if level[node] < level[neighbour]:
-            if neighbour in exits:
-                #If we found the exit, find the edges that form the chain to the exit and determine the bottleneck (maximum total capacity)
-                q.put(neighbour)
-                chain = [q.get() for x in range(q.qsize())]
-                chain_edges = list(zip(chain, chain[1:]))
-                chain_capacities = [path[edge[1]][edge[0]] for edge in chain_edges]
-                bottleneck = min(chain_capacities)
-
-                #Augment path along the chain
-                for edge in chain_edges:
-                    path[edge[1]][edge[0]] -= bottleneck
-                    path[edge[0]][edge[1]] -= bottleneck
-
-                return (path, bottleneck)
+def max_flow(network, entrances, exits, method="dinic"):
+    """
+    (ResidualGraph, list of ints, list of ints, str) -> int
 
-            else:
-                #If we haven't found a neighbour, add to the queue and set and try again
-                q.put(neighbour)
-                visited.add(neighbour)
-                continue
+    Connect the entrances and exits to a super source and sink and return the maximum flow between them
+    method selects the engine: "dinic", "scaling" (capacity-scaling Dinic) or "push_relabel"
+    The network is left holding the residual state of the flow
+    """
 
-    #Exit has not been found
-    return False
+    source, sink = network.add_terminals(entrances, exits)
+    if method == "dinic":
+        return network.dinic(source, sink)
+    if method == "scaling":
+        return network.scaling_dinic(source, sink)
+    if method == "push_relabel":
+        return network.push_relabel(source, sink)
+    raise ValueError("Unknown max flow method: " + str(method))
 
-def solution(entrances, exits, path):
+def solution(entrances, exits, path, method="dinic"):
     """
-    (list of ints, list of ints, list of list of ints) -> int
+    (list of ints, list of ints, list of list of ints, str) -> int
 
     Consider a directed graph with nodes 0->n
     Each node represents a room and each edge represents a corridor between two rooms
     We want to find the max flow rate from the entrance nodes to the exit nodes
     Entrances and exits are disjoint and we assume a path to an exit can always be found
     There are at most 50 rooms and 200,000 bunnies so we use Dinic's algorithm
-    A level graph is computed, then use multiple dfs to find the blocking flows, augmenting each path
+    The rooms are joined to a super source and sink in a residual graph with paired reverse edges
+    A level graph is computed, then a blocking flow is found with a current-arc DFS, augmenting each path
     Find a new level graph when no more blocking flows can be found
-    Return the bottleneck sum once a level graph that reaches an exit can no longer be found
+    Return the flow once a level graph that reaches an exit can no longer be found
+    Dense buildings with many entrances and exits may suit method="push_relabel" better
+    method="scaling" runs capacity-scaling Dinic, see benchmark_max_flows.py for how it compares
+    The path matrix is not modified
     """
 
-    level = True
-    bottleneck_sum = 0
-
-    #Level will become False when we can no longer find a level graph
-    while level:
-        level = generate_level_graph(entrances, exits, path)
-        for entrance in entrances:
-            output = True
-            #Output will become False when we can no longer find a blocking flow
-            while output:
-                output = depth_first_search(entrance, exits, path, level)
-                if output:
-                    (path, bottleneck) = output
-                    bottleneck_sum += bottleneck
-
-    return bottleneck_sum
+    return max_flow(ResidualGraph.from_matrix(path), entrances, exits, method)
 
 
 
@@ -9,49 +9,134 @@
 #The last two are considered identical hence we would here return 3
 #Return the output as a string to allow for large numbers
 
+from functools import lru_cache
 from math import gcd
 from math import factorial
 
+def partitions(n):
+	"""
+	(int) -> generator of tuples of tuples of ints
+
+	Generate the partitions of n iteratively as (part, multiplicity) pairs with the parts in decreasing order
+	Partitions come in reverse lexicographic order, starting from ((n, 1),) and ending with ((1, n),)
+	Each step strips the ones, takes one from the smallest part p above 1 and refills with as many p-1 as fit
+	"""
+
+	if n < 1:
+		return
+
+	current = [[n, 1]]
+	while True:
+		yield tuple((part, multiplicity) for part, multiplicity in current)
+
+		#Count the ones, which are always the last pair
+		remaining = 0
+		if current[-1][0] == 1:
+			remaining = current.pop()[1]
+		if not current:
+			return
+
+		#Break up one copy of the smallest part above 1
+		part = current[-1][0]
+		current[-1][1] -= 1
+		if current[-1][1] == 0:
+			current.pop()
+		remaining += part
+
+		#Refill with the largest parts allowed, which are now part-1 and whatever is left over
+		part -= 1
+		current.append([part, remaining//part])
+		if remaining % part:
+			current.append([remaining % part, 1])
+
 def partition(n):
 	"""
 	(int) -> set of tuples of ints
 
-	Generate partitions of n through recursion
-	If n<1 return {(n,)}
+	The partitions of n as sorted tuples, expanded from partitions()
 	"""
 
-	partition_set = set()
-	partition_set.add((n, ))
-
-	#Consider each integer less than n (and greater than 1) as a base number
-	#Add the base + partitions of n-base and repeat for each base
-	for base in range(1, n):
-		remainder = n-base
-		for remainder_partitions in partition(remainder):
-			partition_set.add(tuple(sorted((base, ) + remainder_partitions)))
-	
-	return partition_set
+	return set(tuple(sorted(part for part, multiplicity in pairs for copy in range(multiplicity))) for pairs in partitions(n))
 
 def conjugacy_class_size(partition):
 	"""
-	(int, tuple of ints) -> int
+	(tuple of tuples of ints) -> int
 
 	We use the conjugacy class size formula for the symmetric group
 	Found: https://groupprops.subwiki.org/wiki/Conjugacy_class_size_formula_in_symmetric_group
+	The partition is given as (part, multiplicity) pairs so no counting is needed
 	"""
 
-	#First compute the denominator by finding unique numbers in our partition
-	#Find the how many times each number occurs in the partition and plug into the formula
+	#Each distinct part of size num occurring counts times contributes num^counts * counts! to the denominator
 	denom = 1
-	unique_nums = set(num for num in partition)
-	for num in unique_nums:
-		counts = partition.count(num)
+	total = 0
+	for num, counts in partition:
 		denom *= (num**counts)*factorial(counts)
+		total += num*counts
 
-	size = factorial(sum(partition))//denom
+	size = factorial(total)//denom
 
 	return size
 
+@lru_cache(maxsize=None)
+def conjugacy_classes(n):
+	"""
+	(int) -> tuple of tuples
+
+	Return (partition, conjugacy class size) for every partition of n, cached per n
+	"""
+
+	return tuple((pairs, conjugacy_class_size(pairs)) for pairs in partitions(n))
+
+@lru_cache(maxsize=None)
+def burnside_polynomial(w, h):
+	"""
+	(int, int) -> tuple of tuples of ints
+
+	The number of orbits as a polynomial in s: the sum of c_k*s^k over w!*h!
+	Return the (k, c_k) pairs with non-zero c_k in decreasing k, cached per grid shape
+	Each pair of conjugacy classes adds the product of their sizes to the coefficient of its gcd sum
+	For each w class, the gcd sum against every h cycle length q is computed once as sum of counts*gcd(part, q)
+	"""
+
+	coefficients = {}
+	for w_conjugacy, w_size in conjugacy_classes(w):
+		gcd_sums = [0] + [sum(w_count*gcd(w_element, q) for w_element, w_count in w_conjugacy) for q in range(1, h+1)]
+		for h_conjugacy, h_size in conjugacy_classes(h):
+			exponent = 0
+			for h_element, h_count in h_conjugacy:
+				exponent += h_count*gcd_sums[h_element]
+			coefficients[exponent] = coefficients.get(exponent, 0) + w_size*h_size
+
+	return tuple(sorted(coefficients.items(), reverse=True))
+
+def evaluate_polynomial(terms, s):
+	"""
+	(tuple of tuples of ints, int) -> int
+
+	Evaluate a sparse polynomial given as (exponent, coefficient) pairs in decreasing exponent with Horner's rule
+	Gaps between exponents are bridged with a single power of s
+	"""
+
+	value = 0
+	previous = terms[0][0]
+	for exponent, coefficient in terms:
+		value = value*s**(previous - exponent) + coefficient
+		previous = exponent
+
+	return value*s**previous
+
+def batch_solution(w, h, s_values):
+	"""
+	(int, int, list of ints) -> list of str
+
+	solution() for one grid shape and many numbers of ints, sharing one Burnside polynomial
+	"""
+
+	terms = burnside_polynomial(w, h)
+	denom = factorial(w)*factorial(h)
+	return [str(evaluate_polynomial(terms, s)//denom) for s in s_values]
+
 def solution(w, h, s):
 	"""
 	(int, int, int) -> int
@@ -61,28 +146,11 @@ def solution(w, h, s):
 	Cycle type determines conjugacy class and each cycle type corresponds to an integer partition
 	Size of conjugacy class determined by given function
 	Greatest common divisor determines the number of orbits within a combination of conjugacy classes
+	A w cycle of length p and an h cycle of length q give gcd(p, q) orbits, so repeated parts are counted once with their multiplicities
+	The weighted sum is a polynomial in s, built once per grid shape by burnside_polynomial()
 	"""
 
-	#Generate partitions
-	w_partitions = partition(w)
-	h_partitions = partition(h)
-
-	#Initialise sum
-	numerator = 0
-
-	for w_conjugacy in w_partitions:
-		for h_conjugacy in h_partitions:
-			weight = conjugacy_class_size(w_conjugacy)*conjugacy_class_size(h_conjugacy)
-			greatest_common_divisor = 0
-			for w_element in w_conjugacy:
-				for h_element in h_conjugacy:
-					greatest_common_divisor += gcd(w_element, h_element)
-
-			numerator += weight*(s**greatest_common_divisor)
-
-	denom = factorial(w)*factorial(h)
-
-	return str(numerator//denom)
+	return batch_solution(w, h, [s])[0]
 
 
 
@@ -3,7 +3,42 @@
 #20-Jul-'20
 
 import math
-import cProfile
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from itertools import compress
+from multiprocessing import Pool
+from multiprocessing import shared_memory
+from multiprocessing.util import Finalize
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+#Odd numbers per segment of segmented_sieve(), one byte each so a segment fits in L2 cache
+SEGMENT_SIZE = 1 << 18
+
+#Integers per task handed to a worker by parallel_sieve()
+PARALLEL_TASK_SIZE = 1 << 24
+
+#PrimeTable files: a header, a prime count before every block of bitmap bytes, then the mod-30 wheel bitmap
+#The header and the counts are little-endian whatever the machine, so a table can be moved between architectures
+#Byte k of the bitmap holds one bit for each of 30k + WHEEL, the only residues coprime to 30
+WHEEL = (1, 7, 11, 13, 17, 19, 23, 29)
+WHEEL_BIT = [WHEEL.index(r) if r in WHEEL else None for r in range(30)]
+TABLE_HEADER = struct.Struct("<4sIQQQ")
+TABLE_MAGIC = b"PRMT"
+TABLE_VERSION = 1
+TABLE_BLOCK_BYTES = 4096
+
+#Number of wheel bits of a byte at or below each residue mod 30
+WHEEL_MASK = [(1 << sum(1 for r in WHEEL if r <= residue)) - 1 for residue in range(30)]
+
+#Miller-Rabin with these bases is deterministic for every n < 3.3*10^24
+MILLER_RABIN_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
 
 def SieveOfAtkin(limit, sequence = []):
     """
@@ -67,11 +102,469 @@ def SieveOfAtkin(limit, sequence = []):
 
     return results
 
+def atkin_flags(limit):
+    """
+    (int) -> numpy array of uint8
+
+    Vectorised Sieve of Atkin kernel returning a 0/1 flag for every integer from 0 to limit
+    For each x, the candidates n of a quadratic form are computed for all valid y at once as an array
+    y only runs up to the largest value with n <= limit, and only over the parity the mod-12 rules allow
+    A mod-60 lookup table picks the candidates to flip
+    Within one x, distinct y give distinct n and the three forms cover disjoint residues, so the flips are a single XOR
+    """
+
+    flags = np.zeros(limit + 1, dtype=np.uint8)
+    if limit < 7:
+        flags[[p for p in (2, 3, 5) if p <= limit]] = 1
+        return flags
+
+    form1 = np.zeros(60, dtype=bool)
+    form1[[1, 13, 17, 29, 37, 41, 49, 53]] = True
+    form2 = np.zeros(60, dtype=bool)
+    form2[[7, 19, 31, 43]] = True
+    form3 = np.zeros(60, dtype=bool)
+    form3[[11, 23, 47, 59]] = True
+
+    root = math.isqrt(limit)
+    squares = np.arange(root + 1, dtype=np.int64)**2
+
+    for x in range(1, math.isqrt(limit//2) + 2):
+        candidates = []
+
+        #Case 1: 4x^2+y^2 with y odd
+        n = 4*x*x
+        if n < limit:
+            n = n + squares[1:math.isqrt(limit - n) + 1:2]
+            candidates.append(n[form1[n % 60]])
+
+        #Case 2: 3x^2+y^2 with x odd and y even
+        n = 3*x*x
+        if x % 2 == 1 and n < limit:
+            n = n + squares[2:math.isqrt(limit - n) + 1:2]
+            candidates.append(n[form2[n % 60]])
+
+        #Case 3: 3x^2-y^2 with x > y and x+y odd
+        n = 3*x*x
+        lowest = math.isqrt(max(n - limit, 0))
+        if lowest*lowest < n - limit:
+            lowest += 1
+        if (x + lowest) % 2 == 0:
+            lowest += 1
+        n = n - squares[lowest:x:2]
+        candidates.append(n[form3[n % 60]])
+
+        if candidates:
+            flags[np.concatenate(candidates)] ^= 1
+
+    #Remove the multiples of the squares of the primes found, ignoring 2, 3 and 5 which the forms never produce
+    for p in np.flatnonzero(flags[:root + 1]).tolist():
+        flags[p*p::p*p] = 0
+
+    flags[[2, 3, 5]] = 1
+    return flags
+
+def SieveOfAtkinVectorized(limit):
+    """
+    (int) -> list of int
+
+    Sieve of Atkin using the NumPy kernel atkin_flags(), returning the primes up to limit
+    Falls back to SieveOfAtkin() without NumPy
+
+    >>> SieveOfAtkinVectorized(30)
+    [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+    """
+
+    if np is None:
+        return SieveOfAtkin(limit)
+    return np.flatnonzero(atkin_flags(limit)).tolist()
+
+def pack_flags(flags):
+    """
+    (numpy array of uint8) -> numpy array of uint8
+
+    Pack 0/1 prime flags into a bit array, 8 integers per byte with bit i of byte k for the integer 8k+i
+
+    >>> pack_flags(atkin_flags(15)).tolist()
+    [172, 40]
+    """
+
+    return np.packbits(flags, bitorder="little")
+
+def base_primes(limit):
+    """
+    (int) -> list of int
+
+    Return the primes p with p*p < limit, the only ones needed to sieve below limit
+    Odd primes only, since the segments hold odd numbers
+    Any prime squares SieveOfAtkin() lets through only clear numbers that are already composite
+
+    >>> base_primes(50)
+    [3, 5, 7]
+    """
+
+    return [p for p in SieveOfAtkin(math.isqrt(max(limit - 1, 0)) + 1) if p > 2 and p*p < limit]
+
+def sieve_segment(start, stop, primes):
+    """
+    (int, int, sequence of int) -> bytearray
+
+    Sieve the odd numbers start, start+2, ... below stop, where start is odd and at least 3
+    Return one byte per odd number, 1 if it is prime
+    For each base prime p, the odd multiples from max(p*p, start) are cleared with a single slice assignment
+    """
+
+    size = (stop - start + 1)//2
+    segment = bytearray(b"\x01")*size
+    for p in primes:
+        multiple = p*p
+        if multiple >= stop:
+            break
+        if multiple < start:
+            multiple = (start + p - 1)//p*p
+            if multiple % 2 == 0:
+                multiple += p
+        index = (multiple - start)//2
+        if index < size:
+            segment[index::p] = bytes((size - 1 - index)//p + 1)
+    return segment
+
+def segment_bounds(lo, hi, segment_size):
+    """
+    (int, int, int) -> generator of tuples
+
+    Yield (start, stop) for consecutive segments of segment_size odd numbers covering the odd numbers in [max(lo, 3), hi)
+    """
+
+    start = max(lo, 3) | 1
+    while start < hi:
+        stop = min(start + 2*segment_size, hi)
+        yield (start, stop)
+        start = stop + (stop % 2 == 0)
+
+def segmented_sieve(lo, hi, segment_size=SEGMENT_SIZE):
+    """
+    (int, int, int) -> generator of int
+
+    Yield the primes in [lo, hi) in order, one segment of odd numbers at a time
+    Only the base primes up to sqrt(hi) and one segment of segment_size bytes are ever held in memory
+
+    >>> list(segmented_sieve(0, 20))
+    [2, 3, 5, 7, 11, 13, 17, 19]
+    >>> list(segmented_sieve(10**12, 10**12 + 100))
+    [1000000000039, 1000000000061, 1000000000063, 1000000000091]
+    """
+
+    if lo <= 2 < hi:
+        yield 2
+
+    primes = base_primes(hi)
+    for start, stop in segment_bounds(lo, hi, segment_size):
+        yield from compress(range(start, stop, 2), sieve_segment(start, stop, primes))
+
+def _attach_base_primes(name, length):
+    """
+    (str, int) -> NoneType
+
+    Pool initializer: attach to the shared memory block holding the base primes
+    The primes are read in place through a memoryview rather than copied into the worker
+    The view is released and the block closed when the worker exits
+    """
+
+    global _SHARED_PRIMES, _BASE_PRIMES
+    _SHARED_PRIMES = shared_memory.SharedMemory(name=name)
+    _BASE_PRIMES = _SHARED_PRIMES.buf[:8*length].cast("q")
+    Finalize(None, _detach_base_primes, exitpriority=0)
+
+def _detach_base_primes():
+    """
+    () -> NoneType
+
+    Pool worker finalizer: release the view of the base primes and close the shared memory block
+    """
+
+    global _SHARED_PRIMES, _BASE_PRIMES
+    _BASE_PRIMES.release()
+    _SHARED_PRIMES.close()
+    _BASE_PRIMES = None
+    _SHARED_PRIMES = None
+
+def _sieve_task(task):
+    """
+    (tuple) -> int or array of int
+
+    Pool worker: sieve the range [start, stop) one cache-sized segment at a time
+    Return the number of primes, or the primes themselves as an array('q') which pickles compactly
+    """
+
+    lo, hi, count_only = task
+    result = 0 if count_only else array("q")
+    for start, stop in segment_bounds(lo, hi, SEGMENT_SIZE):
+        segment = sieve_segment(start, stop, _BASE_PRIMES)
+        if count_only:
+            result += segment.count(1)
+        else:
+            result.extend(compress(range(start, stop, 2), segment))
+    return result
+
+def _parallel_results(lo, hi, count_only, processes, task_size):
+    """
+    (int, int, bool, int, int) -> generator
+
+    Split [lo, hi) into tasks of task_size integers, sieve them in a process pool and yield the results in order
+    The base primes are placed once in shared memory rather than being pickled for every task
+    """
+
+    primes = array("q", base_primes(hi))
+    shared = shared_memory.SharedMemory(create=True, size=max(8*len(primes), 8))
+    try:
+        shared.buf[:8*len(primes)] = primes.tobytes()
+        tasks = [(start, min(start + task_size, hi), count_only) for start in range(lo, hi, task_size)]
+        with Pool(processes, initializer=_attach_base_primes, initargs=(shared.name, len(primes))) as pool:
+            yield from pool.imap(_sieve_task, tasks)
+
+            #Let the workers exit normally so they close their handles on the block
+            pool.close()
+            pool.join()
+    finally:
+        shared.close()
+        shared.unlink()
+
+def parallel_sieve(lo, hi, processes=None, task_size=PARALLEL_TASK_SIZE):
+    """
+    (int, int, int, int) -> generator of int
+
+    Yield the primes in [lo, hi) in order, sieving tasks of task_size integers on processes cores
+    Results are streamed back task by task as soon as every earlier task has finished
+    """
+
+    lo = max(lo, 2)
+    if lo <= 2 < hi:
+        yield 2
+    if lo >= hi:
+        return
+    for primes in _parallel_results(lo, hi, False, processes, task_size):
+        yield from primes
+
+def parallel_prime_count(lo, hi, processes=None, task_size=PARALLEL_TASK_SIZE):
+    """
+    (int, int, int, int) -> int
+
+    Count the primes in [lo, hi) with the process pool of parallel_sieve(), returning only a count per task
+    """
+
+    lo = max(lo, 2)
+    if lo >= hi:
+        return 0
+    return (lo <= 2 < hi) + sum(_parallel_results(lo, hi, True, processes, task_size))
+
+def is_probable_prime(n):
+    """
+    (int) -> bool
+
+    Miller-Rabin test with the first 13 primes as bases, deterministic below 3.3*10^24
+
+    >>> is_probable_prime(10**12 + 39), is_probable_prime(561)
+    (True, False)
+    """
+
+    if n < 2:
+        return False
+    for p in MILLER_RABIN_BASES:
+        if n % p == 0:
+            return n == p
+
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+
+    for a in MILLER_RABIN_BASES:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for r in range(s - 1):
+            x = x*x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+def wheel_bytes(lo_byte, hi_byte, limit, primes):
+    """
+    (int, int, int, list of int) -> bytes
+
+    Sieve the integers 30*lo_byte to 30*hi_byte and pack them onto the mod-30 wheel, one byte per 30 integers
+    Integers above limit are left clear
+    """
+
+    start = 30*lo_byte + 1
+    stop = min(30*hi_byte, limit + 1)
+    segment = sieve_segment(start, stop, primes) if start < stop else bytearray()
+    if lo_byte == 0 and segment:
+        segment[0] = 0
+    segment += bytes(15*(hi_byte - lo_byte) - len(segment))
+
+    #Odd number 30k + 2j + 1 is at segment[15k + j], so the wheel residues are at j = (r - 1)/2
+    offsets = [(r - 1)//2 for r in WHEEL]
+    if np is not None:
+        odd = np.frombuffer(bytes(segment), dtype=np.uint8).reshape(-1, 15)[:, offsets]
+        return np.packbits(odd, axis=1, bitorder="little").tobytes()
+    return bytes(sum(segment[base + offset] << bit for bit, offset in enumerate(offsets)) for base in range(0, len(segment), 15))
+
+class PrimeTable:
+    def __init__(self, path):
+        """
+        (PrimeTable, str) -> NoneType
+
+        Memory-map a prime table written by PrimeTable.build()
+        Nothing is read until queried, so opening even a very large table takes milliseconds
+        """
+
+        self.path = path
+        with open(path, "rb") as table_file:
+            self.mmap = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic = version = None
+        if len(self.mmap) >= TABLE_HEADER.size:
+            magic, version, self.limit, self.num_bytes, self.block_bytes = TABLE_HEADER.unpack_from(self.mmap)
+        if magic != TABLE_MAGIC or version != TABLE_VERSION:
+            self.mmap.close()
+            raise ValueError(path + " is not a version " + str(TABLE_VERSION) + " prime table")
+
+        num_blocks = -(-self.num_bytes//self.block_bytes)
+        index_start = TABLE_HEADER.size
+        bitmap_start = index_start + 8*(num_blocks + 1)
+        self.index = memoryview(self.mmap)[index_start:bitmap_start].cast("Q")
+        if sys.byteorder != "little":
+            #The index is stored little-endian like the header, so big-endian machines read a byte-swapped copy
+            swapped = array("Q", self.index)
+            swapped.byteswap()
+            self.index.release()
+            self.index = swapped
+        self.bitmap = memoryview(self.mmap)[bitmap_start:bitmap_start + self.num_bytes]
+
+    @classmethod
+    def build(cls, path, limit, block_bytes=TABLE_BLOCK_BYTES):
+        """
+        (type, str, int, int) -> PrimeTable
+
+        Sieve every integer up to limit, write the wheel bitmap and its block index to path and open it
+        The bitmap is written one segment at a time so memory stays O(sqrt(limit) + segment)
+        """
+
+        num_bytes = limit//30 + 1
+        num_blocks = -(-num_bytes//block_bytes)
+        index = array("Q", [0])
+        primes = base_primes(limit + 1)
+
+        #Segments are whole blocks so the index can be filled in as they are written
+        segment_bytes = block_bytes*max(1, SEGMENT_SIZE//(15*block_bytes))
+        with open(path, "wb") as table_file:
+            table_file.write(TABLE_HEADER.pack(TABLE_MAGIC, TABLE_VERSION, limit, num_bytes, block_bytes))
+            table_file.write(bytes(8*(num_blocks + 1)))
+            for lo_byte in range(0, num_bytes, segment_bytes):
+                hi_byte = min(lo_byte + segment_bytes, num_bytes)
+                packed = wheel_bytes(lo_byte, hi_byte, limit, primes)
+                table_file.write(packed)
+                for block_start in range(0, len(packed), block_bytes):
+                    index.append(index[-1] + int.from_bytes(packed[block_start:block_start + block_bytes], "little").bit_count())
+
+            table_file.seek(TABLE_HEADER.size)
+            if sys.byteorder != "little":
+                index.byteswap()
+            index.tofile(table_file)
+        return cls(path)
+
+    def close(self):
+        """
+        (PrimeTable) -> NoneType
+
+        Release the views and unmap the file
+        """
+
+        if isinstance(self.index, memoryview):
+            self.index.release()
+        self.bitmap.release()
+        self.mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def is_prime(self, n):
+        """
+        (PrimeTable, int) -> bool
+
+        Look n up in the bitmap in O(1), or fall back to Miller-Rabin above the table limit
+        """
+
+        if n > self.limit:
+            return is_probable_prime(n)
+        if n < 7:
+            return n in (2, 3, 5)
+        bit = WHEEL_BIT[n % 30]
+        return bit is not None and self.bitmap[n//30] >> bit & 1 == 1
+
+    def prime_pi(self, n):
+        """
+        (PrimeTable, int) -> int
+
+        Count the primes up to n from the block index plus a popcount of at most one block of the bitmap
+        """
+
+        if n > self.limit:
+            raise ValueError(str(n) + " is above the table limit " + str(self.limit))
+        if n < 7:
+            return sum(1 for p in (2, 3, 5) if p <= n)
+
+        byte = n//30
+        block_start = byte - byte % self.block_bytes
+        count = 3 + self.index[block_start//self.block_bytes]
+        count += int.from_bytes(self.bitmap[block_start:byte], "little").bit_count()
+        return count + (self.bitmap[byte] & WHEEL_MASK[n % 30]).bit_count()
+
+    def nth_prime(self, k):
+        """
+        (PrimeTable, int) -> int
+
+        Return the kth prime, counting 2 as the first
+        Binary search the block index, then walk the bytes of one block
+        """
+
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        num_primes = self.prime_pi(self.limit)
+        if k > num_primes:
+            raise ValueError("the table only holds " + str(num_primes) + " primes")
+        if k <= 3:
+            return (2, 3, 5)[k - 1]
+
+        k -= 3
+
+        block = bisect_right(self.index, k - 1) - 1
+        k -= self.index[block]
+        byte = block*self.block_bytes
+        while True:
+            bits = self.bitmap[byte]
+            count = bits.bit_count()
+            if k <= count:
+                break
+            k -= count
+            byte += 1
+
+        for bit, residue in enumerate(WHEEL):
+            if bits >> bit & 1:
+                k -= 1
+                if k == 0:
+                    return 30*byte + residue
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
 
     primes = SieveOfAtkin(1000)
     print("List of primes up to 1000: ", primes)
-
-    # cProfile.run('SieveOfAtkin(10000)')
\ No newline at end of file
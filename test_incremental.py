@@ -0,0 +1,187 @@
+#Incremental Update Tests
+#18-Oct-'26
+
+#Randomised checks that the incremental updates agree with rebuilding from scratch after every edit
+#Run with pytest, or directly with python test_incremental.py
+
+from random import Random
+
+from changing_mazes import GridGraph
+from changing_mazes import SAMPLE_MAZE
+from changing_mazes import flatten_maze
+from changing_mazes import graph
+from changing_mazes import removals_search
+from escape_the_building import floyd_warshall
+from escape_the_building import update_shortest_paths
+from escaping_and_max_flows import FlowNetwork
+from escaping_and_max_flows import solution as max_flow_solution
+
+def contracted_graph(maze):
+    """
+    (list of lists) -> graph
+
+    Generate the graph of a maze and contract it, as solution_by_barrier() does
+    """
+
+    path = graph(maze)
+    path.generate_nodes()
+    path.generate_graph_dict()
+    path.contract()
+    return path
+
+def check_set_cell(maze, num_edits, seed):
+    """
+    (list of lists, int, int) -> NoneType
+
+    Toggle random cells of a copy of the maze with set_cell(), apart from the start and end
+    After each edit, assert find_shortest_path_incremental() agrees with a graph rebuilt and solved from scratch
+    and with a breadth-first search of the flattened maze
+    """
+
+    generator = Random(seed)
+    path = contracted_graph([row[:] for row in maze])
+    path.find_shortest_path_incremental()
+
+    for edit in range(num_edits):
+        x = generator.randrange(path.width)
+        y = generator.randrange(path.height)
+        if (x, y) == path.start or (x, y) == path.end:
+            continue
+        value = 1 - path.maze_list[y][x]
+        path.set_cell(x, y, value)
+
+        incremental = path.find_shortest_path_incremental()
+        rebuilt = contracted_graph([row[:] for row in path.maze_list]).find_shortest_path()
+        searched = removals_search(flatten_maze(path.maze_list), path.width, path.height, 0, path.width*path.height - 1, 0)
+        assert incremental == rebuilt == searched, ("edit " + str(edit) + ", set_cell(" + str(x) + ", " + str(y) + ", " + str(value) + "): " +
+                                                    "incremental " + str(incremental) + ", rebuilt " + str(rebuilt) + ", BFS " + str(searched) +
+                                                    "\nmaze " + str(path.maze_list))
+
+def test_set_cell_sample_maze():
+    check_set_cell(SAMPLE_MAZE, 200, 0)
+
+def test_set_cell_open_grid():
+    check_set_cell([[0]*12 for row in range(12)], 300, 1)
+
+def check_grid_set_cell(maze, num_edits, seed):
+    """
+    (list of lists, int, int) -> NoneType
+
+    Toggle random cells of a GridGraph with set_cell()
+    After each edit, assert its node and barrier masks match those of a GridGraph rebuilt from its cells
+    """
+
+    generator = Random(seed)
+    grid = GridGraph(maze)
+    grid.generate_nodes()
+    grid.generate_barriers()
+    grid.remove_irrelevant_barriers()
+
+    for edit in range(num_edits):
+        x = generator.randrange(grid.width)
+        y = generator.randrange(grid.height)
+        value = 1 - grid.cells[y*grid.width + x]
+        grid.set_cell(x, y, value)
+
+        rebuilt = GridGraph.from_cells(grid.cells, grid.width, grid.height)
+        rebuilt.generate_nodes()
+        rebuilt.generate_barriers()
+        rebuilt.remove_irrelevant_barriers()
+        assert grid.nodes == rebuilt.nodes and grid.barriers == rebuilt.barriers, (
+            "edit " + str(edit) + ", set_cell(" + str(x) + ", " + str(y) + ", " + str(value) + "): " +
+            "nodes " + str(list(grid.nodes)) + ", expected " + str(list(rebuilt.nodes)) +
+            "\nbarriers " + str(list(grid.barriers)) + ", expected " + str(list(rebuilt.barriers)) +
+            "\ncells " + str(list(grid.cells)))
+
+def test_grid_set_cell_sample_maze():
+    check_grid_set_cell(SAMPLE_MAZE, 300, 2)
+
+def test_grid_set_cell_out_of_bounds():
+    grid = GridGraph(SAMPLE_MAZE)
+    for x, y in ((-1, 0), (0, -1), (grid.width, 0), (0, grid.height)):
+        try:
+            grid.set_cell(x, y, 1)
+        except ValueError:
+            continue
+        raise AssertionError("set_cell(" + str(x) + ", " + str(y) + ", 1) accepted a cell outside the grid")
+
+def check_update_capacity(entrances, exits, path, num_edits, seed):
+    """
+    (list of ints, list of ints, list of lists of ints, int, int) -> NoneType
+
+    Change random corridor capacities of a copy of the building with FlowNetwork.update_capacity()
+    Both existing corridors and new ones are changed, and capacities are raised and lowered, sometimes to zero
+    After each change, assert the repaired flow agrees with solving the changed matrix from scratch
+    and that the capacities of the min_cut() corridors sum to the flow
+    """
+
+    generator = Random(seed)
+    path = [row[:] for row in path]
+    network = FlowNetwork.from_matrix(entrances, exits, path)
+    network.max_flow()
+
+    for edit in range(num_edits):
+        start_room = generator.randrange(len(path))
+        end_room = generator.randrange(len(path))
+        if start_room == end_room:
+            continue
+        capacity = generator.choice([0, generator.randint(1, 30)])
+        path[start_room][end_room] = capacity
+
+        flow = network.update_capacity(start_room, end_room, capacity)
+        cut = sum(path[cut_start][cut_end] for cut_start, cut_end in network.min_cut())
+        expected = max_flow_solution(entrances, exits, path)
+        assert flow == cut == expected, ("edit " + str(edit) + ", update_capacity(" + str(start_room) + ", " + str(end_room) + ", " + str(capacity) + "): " +
+                                         "flow " + str(flow) + ", min cut " + str(cut) + ", from scratch " + str(expected) +
+                                         "\npath " + str(path))
+
+def test_update_capacity_sample_building():
+    check_update_capacity([0, 1], [4, 5], [[0, 0, 4, 6, 0, 0], [0, 0, 5, 2, 0, 0], [0, 0, 0, 0, 4, 4], [0, 0, 0, 0, 6, 6], [0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0]], 100, 0)
+
+def test_update_capacity_larger_building():
+    path = [[0, 5, 10, 15, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 10, 0, 0, 0, 0, 0, 0], [0, 15, 0, 0, 0, 20, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 25, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 25, 0, 10, 0, 0, 0], [0, 0, 0, 5, 0, 0, 0, 0, 30, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0, 20, 10, 0], [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 5],
+            [0, 0, 0, 0, 15, 0, 0, 0, 0, 15, 15], [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 10], [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]]
+    check_update_capacity([0], [10], path, 200, 1)
+
+def check_update_shortest_paths(times, num_edits, seed):
+    """
+    (list of lists of ints, int, int) -> NoneType
+
+    Change random corridor times of a copy of the prison, self-loops included, and repair the shortest paths with update_shortest_paths()
+    After each change, assert they agree with floyd_warshall() run from scratch on the changed times
+    Once a negative cycle is created, the shortest paths are rebuilt from scratch as EscapePlanner.update_time() does
+    """
+
+    generator = Random(seed)
+    corridors = [list(row) for row in times]
+    dist = floyd_warshall([list(row) for row in corridors])
+
+    for edit in range(num_edits):
+        start = generator.randrange(len(corridors))
+        end = generator.randrange(len(corridors))
+        time = generator.randint(-2, 9)
+
+        if dist:
+            dist = update_shortest_paths(dist, corridors, start, end, time)
+        else:
+            corridors[start][end] = time
+            dist = floyd_warshall([list(row) for row in corridors])
+
+        expected = floyd_warshall([list(row) for row in corridors])
+        assert dist == expected, ("edit " + str(edit) + ", time " + str(start) + " -> " + str(end) + " set to " + str(time) + ": " +
+                                  "repaired " + str(dist) + ", from scratch " + str(expected) + "\ntimes " + str(corridors))
+
+def test_update_shortest_paths_sample_prison():
+    check_update_shortest_paths([[0, 2, 2, 2, -1], [9, 0, 2, 2, -1], [9, 3, 0, 2, -1], [9, 3, 2, 0, -1], [9, 3, 2, 2, 0]], 300, 0)
+
+def test_update_shortest_paths_uniform_prison():
+    check_update_shortest_paths([[0, 1, 1, 1, 1], [1, 0, 1, 1, 1], [1, 1, 0, 1, 1], [1, 1, 1, 0, 1], [1, 1, 1, 1, 0]], 300, 1)
+
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(name + " passed")